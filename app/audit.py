@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from app import db
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AuditRecorder:
+    def __init__(self) -> None:
+        self.run: tuple[str, str, str, dict[str, Any]] | None = None
+        self.orders: list[tuple[Any, ...]] = []
+        self.risk_events: list[tuple[str, str, str, dict[str, Any]]] = []
+        self.run_id: int | None = None
+
+    def begin(self) -> int:
+        if self.run_id is None:
+            self.run_id = db.start_run()
+        return self.run_id
+
+    def set_run(self, status: str, summary: str, details: dict[str, Any]) -> None:
+        self.run = (db.utcnow_iso(), status, summary, details)
+
+    def add_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        status: str,
+        broker_order_id: str | None,
+        reason: str | None = None,
+        client_order_id: str | None = None,
+        broker_status: str | None = None,
+        notional: float | None = None,
+    ) -> None:
+        self.orders.append(
+            (
+                db.utcnow_iso(),
+                symbol,
+                side,
+                qty,
+                status,
+                broker_order_id,
+                reason,
+                client_order_id,
+                broker_status,
+                notional,
+            )
+        )
+
+    def add_risk_event(self, level: str, reason: str, context: dict[str, Any]) -> None:
+        self.risk_events.append((db.utcnow_iso(), level, reason, context))
+
+    def flush(self) -> int | None:
+        run_id = db.insert_audit_batch(self.run, self.orders, self.risk_events, self.run_id)
+        self.run = None
+        self.run_id = None
+        self.orders = []
+        self.risk_events = []
+        return run_id
+
+
+class BackgroundWriter:
+    def __init__(
+        self,
+        write: Callable[[list[Any]], None],
+        interval_seconds: float | None = None,
+        max_batch: int = 1000,
+    ) -> None:
+        self.write = write
+        self.interval_seconds = (
+            settings.audit_flush_interval_seconds if interval_seconds is None else interval_seconds
+        )
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, rows: list[Any]) -> None:
+        for row in rows:
+            self._queue.put(row)
+        if self._thread is None and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch: list[Any] = []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                self.write(batch)
+                written += len(batch)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception("background audit flush failed")
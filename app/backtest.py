@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import heapq
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.config import settings
+from app.strategies import Strategy
+
+ORDER_RATE_WINDOW_SECONDS = 3600
+
+
+@dataclass(frozen=True, slots=True)
+class BarData:
+    symbols: list[str]
+    timestamps: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __post_init__(self) -> None:
+        shape = (len(self.timestamps), len(self.symbols))
+        for name in ("open", "high", "low", "close", "volume"):
+            if getattr(self, name).shape != shape:
+                raise ValueError(f"{name} must have shape {shape}")
+
+    def select(self, symbols: list[str]) -> BarData:
+        if symbols == self.symbols:
+            return self
+        missing = [s for s in symbols if s not in self.symbols]
+        if missing:
+            raise ValueError(f"No bars for {', '.join(missing)}")
+        idx = [self.symbols.index(s) for s in symbols]
+        return BarData(
+            symbols=list(symbols),
+            timestamps=self.timestamps,
+            open=self.open[:, idx],
+            high=self.high[:, idx],
+            low=self.low[:, idx],
+            close=self.close[:, idx],
+            volume=self.volume[:, idx],
+        )
+
+
+@dataclass(slots=True)
+class BacktestConfig:
+    initial_equity: float = 100000.0
+    fee_rate: float = 0.0025
+    slippage_bps: float = 5.0
+    max_drawdown: float = field(default_factory=lambda: settings.max_drawdown_from_peak)
+    max_daily_loss: float = field(default_factory=lambda: settings.max_daily_loss)
+    per_trade_risk: float = field(default_factory=lambda: settings.per_trade_risk)
+    max_gross_exposure: float = field(default_factory=lambda: settings.max_gross_exposure)
+    max_orders_per_hour: int = field(default_factory=lambda: settings.max_orders_per_hour)
+
+    @property
+    def cost_rate(self) -> float:
+        return self.fee_rate + self.slippage_bps / 10000
+
+
+@dataclass(slots=True)
+class BacktestResult:
+    symbols: list[str]
+    timestamps: np.ndarray
+    equity: np.ndarray
+    drawdown: np.ndarray
+    turnover: np.ndarray
+    weights: np.ndarray
+    trades: list[dict[str, Any]]
+    summary: dict[str, Any]
+
+    def save(self, directory: str | Path) -> Path:
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "summary.json").write_text(json.dumps(self.summary, indent=2))
+        (path / "trades.json").write_text(json.dumps(self.trades))
+        np.savez_compressed(
+            path / "curves.npz",
+            symbols=np.array(self.symbols),
+            timestamps=self.timestamps,
+            equity=self.equity,
+            drawdown=self.drawdown,
+            turnover=self.turnover,
+            weights=self.weights,
+        )
+        return path
+
+
+def run_backtest(
+    strategy: Strategy, bars: BarData, config: BacktestConfig | None = None
+) -> BacktestResult:
+    config = config or BacktestConfig()
+    bars = bars.select(strategy.universe)
+    timestamps = np.asarray(bars.timestamps, dtype=np.int64)
+    close = np.asarray(bars.close, dtype=np.float64)
+
+    targets = cap_gross_exposure(strategy.target_weights(close), config.max_gross_exposure)
+    held, blocked = gate_orders(targets, timestamps, config)
+    returns = bar_returns(close)
+    equity, turnover, costs = simulate(held, returns, config)
+
+    paused = risk_pauses(equity, timestamps, config)
+    if paused.any():
+        trading = np.any(np.diff(held, axis=0, prepend=0.0) != 0, axis=1)
+        blocked["paused"] = int(np.count_nonzero(paused & trading))
+        held = freeze_weights(held, paused)
+        equity, turnover, costs = simulate(held, returns, config)
+
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity)
+    trades = trade_list(held, close, equity, timestamps, bars.symbols, config)
+    summary = summarize(strategy, bars.symbols, timestamps, equity, drawdown, turnover, config)
+    summary.update(trades=len(trades), costs_paid=float(costs.sum()), blocked=blocked)
+    return BacktestResult(
+        symbols=list(bars.symbols),
+        timestamps=timestamps,
+        equity=equity,
+        drawdown=drawdown,
+        turnover=turnover,
+        weights=held,
+        trades=trades,
+        summary=summary,
+    )
+
+
+def cap_gross_exposure(targets: np.ndarray, max_gross_exposure: float) -> np.ndarray:
+    gross = np.abs(targets).sum(axis=1)
+    over = gross > max_gross_exposure
+    if not over.any():
+        return targets
+    capped = targets.copy()
+    capped[over] *= (max_gross_exposure / gross[over])[:, None]
+    return capped
+
+
+def gate_orders(
+    targets: np.ndarray, timestamps: np.ndarray, config: BacktestConfig
+) -> tuple[np.ndarray, dict[str, int]]:
+    n_bars, n_symbols = targets.shape
+    blocked = {"per_trade_risk": 0, "max_orders_per_hour": 0, "paused": 0}
+    changed = np.empty(targets.shape, dtype=bool)
+    changed[0] = targets[0] != 0
+    np.not_equal(targets[1:], targets[:-1], out=changed[1:])
+    change_bars, change_symbols = np.nonzero(changed)
+
+    times = timestamps.tolist()
+    current = [0.0] * n_symbols
+    filled = np.zeros(targets.shape, dtype=bool)
+    recent: deque[int] = deque()
+    retries: list[tuple[int, int]] = []
+
+    def attempt(t: int, j: int) -> None:
+        target = float(targets[t, j])
+        if target == current[j]:
+            return
+        if abs(target - current[j]) > config.per_trade_risk:
+            blocked["per_trade_risk"] += 1
+            return
+        now = times[t]
+        while recent and recent[0] <= now - ORDER_RATE_WINDOW_SECONDS:
+            recent.popleft()
+        if len(recent) >= config.max_orders_per_hour:
+            blocked["max_orders_per_hour"] += 1
+            retry = int(
+                np.searchsorted(timestamps, recent[0] + ORDER_RATE_WINDOW_SECONDS, side="left")
+            )
+            if retry < n_bars:
+                heapq.heappush(retries, (retry, j))
+            return
+        current[j] = target
+        filled[t, j] = True
+        recent.append(now)
+
+    for t, j in zip(change_bars.tolist(), change_symbols.tolist(), strict=True):
+        while retries and retries[0] <= (t, j):
+            attempt(*heapq.heappop(retries))
+        attempt(t, j)
+    while retries:
+        attempt(*heapq.heappop(retries))
+
+    source = np.where(filled, np.arange(n_bars)[:, None], 0)
+    np.maximum.accumulate(source, axis=0, out=source)
+    held = np.where(filled, targets, 0.0)
+    return np.take_along_axis(held, source, axis=0), blocked
+
+
+def bar_returns(close: np.ndarray) -> np.ndarray:
+    returns = np.zeros_like(close)
+    np.divide(close[1:], close[:-1], out=returns[1:])
+    returns[1:] -= 1.0
+    return np.nan_to_num(returns, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def simulate(
+    held: np.ndarray, returns: np.ndarray, config: BacktestConfig
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    portfolio = np.zeros(held.shape[0])
+    portfolio[1:] = np.einsum("ij,ij->i", held[:-1], returns[1:])
+    drifted = np.zeros_like(held)
+    np.multiply(held[:-1], 1.0 + returns[1:], out=drifted[1:])
+    drifted[1:] /= (1.0 + portfolio[1:])[:, None]
+    np.subtract(held, drifted, out=drifted)
+    turnover = np.abs(drifted, out=drifted).sum(axis=1)
+
+    pre_trade = 1.0 + portfolio
+    equity = config.initial_equity * np.cumprod(pre_trade * (1.0 - turnover * config.cost_rate))
+    previous = np.concatenate(([config.initial_equity], equity[:-1]))
+    costs = previous * pre_trade * turnover * config.cost_rate
+    return equity, turnover, costs
+
+
+def risk_pauses(equity: np.ndarray, timestamps: np.ndarray, config: BacktestConfig) -> np.ndarray:
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity)
+    day = timestamps // 86400
+    new_day = np.concatenate(([True], day[1:] != day[:-1]))
+    day_start = equity[np.flatnonzero(new_day)][np.cumsum(new_day) - 1]
+    daily_loss = 1.0 - equity / day_start
+    return (drawdown >= config.max_drawdown) | (daily_loss >= config.max_daily_loss)
+
+
+def freeze_weights(held: np.ndarray, paused: np.ndarray) -> np.ndarray:
+    padded = np.vstack([np.zeros((1, held.shape[1])), held])
+    source = np.where(paused, 0, np.arange(1, held.shape[0] + 1))
+    return padded[np.maximum.accumulate(source)]
+
+
+def trade_list(
+    held: np.ndarray,
+    close: np.ndarray,
+    equity: np.ndarray,
+    timestamps: np.ndarray,
+    symbols: list[str],
+    config: BacktestConfig,
+) -> list[dict[str, Any]]:
+    delta = np.diff(held, axis=0, prepend=np.zeros((1, held.shape[1])))
+    bars, columns = np.nonzero(delta)
+    trades = []
+    for t, j in zip(bars.tolist(), columns.tolist(), strict=True):
+        side = "buy" if delta[t, j] > 0 else "sell"
+        slip = config.slippage_bps / 10000
+        notional = abs(float(delta[t, j])) * float(equity[t])
+        trades.append(
+            {
+                "timestamp": int(timestamps[t]),
+                "symbol": symbols[j],
+                "side": side,
+                "weight_delta": float(delta[t, j]),
+                "price": float(close[t, j]) * (1 + slip if side == "buy" else 1 - slip),
+                "notional": notional,
+                "fee": notional * config.fee_rate,
+            }
+        )
+    return trades
+
+
+def summarize(
+    strategy: Strategy,
+    symbols: list[str],
+    timestamps: np.ndarray,
+    equity: np.ndarray,
+    drawdown: np.ndarray,
+    turnover: np.ndarray,
+    config: BacktestConfig,
+) -> dict[str, Any]:
+    bar_seconds = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 60.0
+    periods_per_year = 365 * 86400 / max(bar_seconds, 1.0)
+    returns = equity[1:] / equity[:-1] - 1.0
+    volatility = float(returns.std()) if returns.size else 0.0
+    sharpe = float(returns.mean() / volatility * np.sqrt(periods_per_year)) if volatility else 0.0
+    return {
+        "strategy": strategy.name,
+        "symbols": list(symbols),
+        "bars": int(len(timestamps)),
+        "start": int(timestamps[0]) if len(timestamps) else None,
+        "end": int(timestamps[-1]) if len(timestamps) else None,
+        "initial_equity": config.initial_equity,
+        "final_equity": float(equity[-1]) if equity.size else config.initial_equity,
+        "total_return": float(equity[-1] / config.initial_equity - 1.0) if equity.size else 0.0,
+        "max_drawdown": float(drawdown.max()) if drawdown.size else 0.0,
+        "sharpe": sharpe,
+        "turnover": float(turnover.sum()),
+    }
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.backtest import BarData
+from app.config import settings
+
+COLUMNS: dict[str, np.dtype[Any]] = {
+    "ts": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+TIMEFRAME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    count, unit = timeframe[:-1], TIMEFRAME_UNITS.get(timeframe[-1:])
+    if unit is None or not count.isdigit() or int(count) == 0:
+        raise ValueError(f"Unknown timeframe {timeframe}")
+    return int(count) * unit
+
+
+@dataclass(frozen=True, slots=True)
+class Bar:
+    ts: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+@dataclass(frozen=True, slots=True)
+class BarWindow:
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, index: slice) -> BarWindow:
+        return BarWindow(**{name: getattr(self, name)[index] for name in COLUMNS})
+
+    def bar(self, index: int) -> Bar:
+        return Bar(**{name: getattr(self, name)[index].item() for name in COLUMNS})
+
+    @classmethod
+    def from_bars(cls, bars: Iterable[Bar]) -> BarWindow:
+        items = list(bars)
+        return cls(
+            **{
+                name: np.array([getattr(bar, name) for bar in items], dtype=dtype)
+                for name, dtype in COLUMNS.items()
+            }
+        )
+
+    @classmethod
+    def empty(cls) -> BarWindow:
+        return cls(**{name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()})
+
+
+class BarStore:
+    def __init__(self, root: str | Path | None = None) -> None:
+        self.root = Path(root or settings.bar_store_path)
+        self._lock = threading.Lock()
+        self._maps: dict[tuple[str, str], tuple[int, BarWindow]] = {}
+
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / symbol.replace("/", "_") / timeframe
+
+    def meta(self, symbol: str, timeframe: str) -> dict[str, Any]:
+        try:
+            return json.loads((self._dir(symbol, timeframe) / "meta.json").read_text())
+        except FileNotFoundError:
+            return {"rows": 0, "start": None, "end": None}
+
+    def index(self) -> dict[str, dict[str, Any]]:
+        return {
+            f"{meta_path.parent.parent.name}/{meta_path.parent.name}": json.loads(
+                meta_path.read_text()
+            )
+            for meta_path in sorted(self.root.glob("*/*/meta.json"))
+        }
+
+    def _open(self, symbol: str, timeframe: str) -> BarWindow:
+        path = self._dir(symbol, timeframe)
+        try:
+            stamp = (path / "meta.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return BarWindow.empty()
+        key = (symbol, timeframe)
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            rows = int(self.meta(symbol, timeframe)["rows"])
+            if not rows:
+                return BarWindow.empty()
+            window = BarWindow(
+                **{
+                    name: np.memmap(path / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,))
+                    for name, dtype in COLUMNS.items()
+                }
+            )
+            self._maps[key] = (stamp, window)
+            return window
+
+    def append(self, symbol: str, timeframe: str, bars: BarWindow) -> int:
+        ts = np.asarray(bars.ts, dtype=COLUMNS["ts"])
+        if len(ts) > 1 and np.any(ts[1:] <= ts[:-1]):
+            raise ValueError("bar timestamps must be strictly increasing")
+        path = self._dir(symbol, timeframe)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            meta = self.meta(symbol, timeframe)
+            rows = int(meta["rows"])
+            start = 0 if meta["end"] is None else int(np.searchsorted(ts, meta["end"], "right"))
+            count = len(ts) - start
+            if count <= 0:
+                return 0
+            for name, dtype in COLUMNS.items():
+                values = np.asarray(getattr(bars, name), dtype=dtype)[start:]
+                with open(path / f"{name}.bin", "ab") as handle:
+                    handle.truncate(rows * dtype.itemsize)
+                    handle.write(values.tobytes())
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            self._write_meta(
+                path,
+                {
+                    "rows": rows + count,
+                    "start": int(ts[start]) if meta["start"] is None else meta["start"],
+                    "end": int(ts[-1]),
+                },
+            )
+            self._maps.pop((symbol, timeframe), None)
+        return count
+
+    def _write_meta(self, path: Path, meta: dict[str, Any]) -> None:
+        tmp = path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, path / "meta.json")
+
+    def window(
+        self, symbol: str, timeframe: str, start: int | None = None, end: int | None = None
+    ) -> BarWindow:
+        window = self._open(symbol, timeframe)
+        lo = 0 if start is None else int(np.searchsorted(window.ts, start, "left"))
+        hi = len(window) if end is None else int(np.searchsorted(window.ts, end, "left"))
+        return window[lo:hi]
+
+    def tail(self, symbol: str, timeframe: str, count: int) -> BarWindow:
+        window = self._open(symbol, timeframe)
+        return window[max(0, len(window) - count) :]
+
+    def load(
+        self,
+        symbols: list[str],
+        timeframe: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> BarData:
+        windows = [self.window(symbol, timeframe, start, end) for symbol in symbols]
+        common = windows[0].ts if windows else np.empty(0, dtype=COLUMNS["ts"])
+        for window in windows[1:]:
+            if not np.array_equal(window.ts, common):
+                common = np.intersect1d(common, window.ts, assume_unique=True)
+        rows = [aligned_rows(window.ts, common) for window in windows]
+        columns = {
+            name: stack_columns(
+                [getattr(window, name)[idx] for window, idx in zip(windows, rows, strict=True)],
+                len(common),
+            )
+            for name in ("open", "high", "low", "close", "volume")
+        }
+        return BarData(symbols=list(symbols), timestamps=common, **columns)
+
+
+def aligned_rows(ts: np.ndarray, common: np.ndarray) -> slice | np.ndarray:
+    if not len(common):
+        return slice(0, 0)
+    lo = int(np.searchsorted(ts, common[0]))
+    hi = int(np.searchsorted(ts, common[-1])) + 1
+    if hi - lo == len(common):
+        return slice(lo, hi)
+    return np.searchsorted(ts, common)
+
+
+def stack_columns(columns: list[np.ndarray], rows: int) -> np.ndarray:
+    if len(columns) == 1:
+        return columns[0][:, None]
+    return np.column_stack(columns) if columns else np.empty((rows, 0))
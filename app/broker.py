@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Any
@@ -7,6 +9,7 @@ from typing import Any
 import httpx
 
 from app.config import settings
+from app.metrics import BROKER_REQUEST_SECONDS
 
 
 @dataclass(slots=True)
@@ -15,6 +18,12 @@ class Account:
     cash: float
 
 
+class DuplicateClientOrderId(Exception):
+    def __init__(self, client_order_id: str) -> None:
+        super().__init__(f"Order {client_order_id} already exists")
+        self.client_order_id = client_order_id
+
+
 class BrokerAdapter(ABC):
     @abstractmethod
     def get_account(self) -> Account: ...
@@ -25,6 +34,9 @@ class BrokerAdapter(ABC):
     @abstractmethod
     def get_latest_price(self, symbol: str) -> float: ...
 
+    def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        return {symbol: self.get_latest_price(symbol) for symbol in symbols}
+
     @abstractmethod
     def place_order(
         self,
@@ -33,17 +45,25 @@ class BrokerAdapter(ABC):
         qty: float,
         order_type: str,
         limit_price: float | None = None,
+        client_order_id: str | None = None,
     ) -> dict[str, Any]: ...
 
+    @abstractmethod
+    def get_order_by_client_id(self, client_order_id: str) -> dict[str, Any] | None: ...
+
     @abstractmethod
     def cancel_order(self, order_id: str) -> dict[str, Any]: ...
 
+    def close(self) -> None:
+        return None
+
 
 class BrokerMock(BrokerAdapter):
     def __init__(self) -> None:
         self.positions: dict[str, float] = {}
         self.prices = {"BTCUSD": 50000.0, "ETHUSD": 3000.0}
         self.equity = 100000.0
+        self.orders: dict[str, dict[str, Any]] = {}
 
     def get_account(self) -> Account:
         return Account(equity=self.equity, cash=self.equity * 0.5)
@@ -58,49 +78,150 @@ class BrokerMock(BrokerAdapter):
     def get_latest_price(self, symbol: str) -> float:
         return self.prices.get(symbol, 100.0)
 
+    def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        return {symbol: self.prices.get(symbol, 100.0) for symbol in symbols}
+
     def place_order(
-        self, symbol: str, side: str, qty: float, order_type: str, limit_price: float | None = None
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        limit_price: float | None = None,
+        client_order_id: str | None = None,
     ) -> dict[str, Any]:
+        if client_order_id is not None and client_order_id in self.orders:
+            raise DuplicateClientOrderId(client_order_id)
         current = self.positions.get(symbol, 0.0)
         self.positions[symbol] = current + qty if side == "buy" else current - qty
-        return {
+        order = {
             "id": f"mock-{symbol}-{qty}",
+            "client_order_id": client_order_id,
+            "symbol": symbol,
+            "side": side,
+            "qty": qty,
             "status": "accepted",
             "type": order_type,
             "limit_price": limit_price,
         }
+        if client_order_id is not None:
+            self.orders[client_order_id] = order
+        return order
+
+    def get_order_by_client_id(self, client_order_id: str) -> dict[str, Any] | None:
+        return self.orders.get(client_order_id)
 
     def cancel_order(self, order_id: str) -> dict[str, Any]:
         return {"id": order_id, "status": "canceled"}
 
 
+def alpaca_client_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.alpaca_max_connections,
+        max_keepalive_connections=settings.alpaca_max_keepalive_connections,
+        keepalive_expiry=settings.alpaca_keepalive_expiry_seconds,
+    )
+
+
+def alpaca_client_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.alpaca_timeout_seconds,
+        connect=settings.alpaca_connect_timeout_seconds,
+    )
+
+
+def alpaca_headers() -> dict[str, str]:
+    if not settings.alpaca_api_key or not settings.alpaca_secret_key:
+        raise ValueError("Alpaca credentials are missing")
+    return {
+        "APCA-API-KEY-ID": settings.alpaca_api_key,
+        "APCA-API-SECRET-KEY": settings.alpaca_secret_key,
+    }
+
+
+def alpaca_order_payload(
+    symbol: str,
+    side: str,
+    qty: float,
+    order_type: str,
+    limit_price: float | None,
+    client_order_id: str | None = None,
+) -> dict[str, Any]:
+    payload = {
+        "symbol": symbol,
+        "side": side,
+        "qty": qty,
+        "type": order_type,
+        "time_in_force": "gtc",
+    }
+    if limit_price is not None:
+        payload["limit_price"] = limit_price
+    if client_order_id is not None:
+        payload["client_order_id"] = client_order_id
+    return payload
+
+
+def endpoint_label(path: str) -> str:
+    if path.startswith("/v2/orders/"):
+        return "/v2/orders/{id}"
+    return path
+
+
+def observe_request(method: str, path: str, status: str, seconds: float) -> None:
+    BROKER_REQUEST_SECONDS.observe(
+        seconds, method=method, endpoint=endpoint_label(path), status=status
+    )
+
+
+def is_duplicate_client_order_id(error: httpx.HTTPStatusError) -> bool:
+    return error.response.status_code == 422 and "client_order_id" in error.response.text
+
+
+def parse_latest_prices(data: dict[str, Any], symbols: list[str]) -> dict[str, float]:
+    quotes = data.get("quotes", {})
+    return {symbol: float(quotes[symbol]["bp"]) for symbol in symbols if symbol in quotes}
+
+
 class AlpacaCryptoBroker(BrokerAdapter):
-    def __init__(self) -> None:
-        if not settings.alpaca_api_key or not settings.alpaca_secret_key:
-            raise ValueError("Alpaca credentials are missing")
+    def __init__(self, client: httpx.Client | None = None) -> None:
+        self.headers = alpaca_headers()
         self.base_url = settings.alpaca_base_url.rstrip("/")
-        self.headers = {
-            "APCA-API-KEY-ID": settings.alpaca_api_key,
-            "APCA-API-SECRET-KEY": settings.alpaca_secret_key,
-        }
+        self.client = client or httpx.Client(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=alpaca_client_timeout(),
+            limits=alpaca_client_limits(),
+            http2=settings.alpaca_http2,
+        )
 
-    def _get(self, path: str) -> Any:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(f"{self.base_url}{path}", headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+    def _request(
+        self,
+        method: str,
+        path: str,
+        payload: dict[str, Any] | None = None,
+        params: dict[str, str] | None = None,
+    ) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = self.client.request(method, path, json=payload, params=params)
+            status = str(response.status_code)
+        finally:
+            observe_request(method, path, status, time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    def _get(self, path: str, params: dict[str, str] | None = None) -> Any:
+        return self._request("GET", path, params=params)
 
     def _post(self, path: str, payload: dict[str, Any]) -> Any:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.post(f"{self.base_url}{path}", headers=self.headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+        return self._request("POST", path, payload)
 
     def _delete(self, path: str) -> Any:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.delete(f"{self.base_url}{path}", headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return self._request("DELETE", path)
+
+    def close(self) -> None:
+        self.client.close()
 
     def get_account(self) -> Account:
         data = self._get("/v2/account")
@@ -110,28 +231,210 @@ class AlpacaCryptoBroker(BrokerAdapter):
         return self._get("/v2/positions")
 
     def get_latest_price(self, symbol: str) -> float:
-        data = self._get(f"/v1beta3/crypto/us/latest/quotes?symbols={symbol}")
-        return float(data["quotes"][symbol]["bp"])
+        return self.get_latest_prices([symbol])[symbol]
+
+    def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        if not symbols:
+            return {}
+        data = self._get("/v1beta3/crypto/us/latest/quotes", params={"symbols": ",".join(symbols)})
+        return parse_latest_prices(data, symbols)
 
     def place_order(
-        self, symbol: str, side: str, qty: float, order_type: str, limit_price: float | None = None
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        limit_price: float | None = None,
+        client_order_id: str | None = None,
     ) -> dict[str, Any]:
-        payload = {
-            "symbol": symbol,
-            "side": side,
-            "qty": qty,
-            "type": order_type,
-            "time_in_force": "gtc",
-        }
-        if limit_price is not None:
-            payload["limit_price"] = limit_price
-        return self._post("/v2/orders", payload)
+        payload = alpaca_order_payload(symbol, side, qty, order_type, limit_price, client_order_id)
+        try:
+            return self._post("/v2/orders", payload)
+        except httpx.HTTPStatusError as error:
+            if client_order_id is not None and is_duplicate_client_order_id(error):
+                raise DuplicateClientOrderId(client_order_id) from error
+            raise
+
+    def get_order_by_client_id(self, client_order_id: str) -> dict[str, Any] | None:
+        try:
+            return self._get(
+                "/v2/orders:by_client_order_id", params={"client_order_id": client_order_id}
+            )
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code == 404:
+                return None
+            raise
 
     def cancel_order(self, order_id: str) -> dict[str, Any]:
         return self._delete(f"/v2/orders/{order_id}")
 
 
+class AsyncBrokerAdapter(ABC):
+    @abstractmethod
+    async def get_account(self) -> Account: ...
+
+    @abstractmethod
+    async def get_positions(self) -> list[dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_latest_prices(self, symbols: list[str]) -> dict[str, float]: ...
+
+    async def get_latest_price(self, symbol: str) -> float:
+        return (await self.get_latest_prices([symbol]))[symbol]
+
+    @abstractmethod
+    async def place_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        limit_price: float | None = None,
+        client_order_id: str | None = None,
+    ) -> dict[str, Any]: ...
+
+    @abstractmethod
+    async def get_order_by_client_id(self, client_order_id: str) -> dict[str, Any] | None: ...
+
+    @abstractmethod
+    async def cancel_order(self, order_id: str) -> dict[str, Any]: ...
+
+    async def aclose(self) -> None:
+        return None
+
+
+class AsyncBrokerMock(AsyncBrokerAdapter):
+    def __init__(self, broker: BrokerMock | None = None, latency: float = 0.0) -> None:
+        self.broker = broker or BrokerMock()
+        self.latency = latency
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_account(self) -> Account:
+        await self._delay()
+        return self.broker.get_account()
+
+    async def get_positions(self) -> list[dict[str, Any]]:
+        await self._delay()
+        return self.broker.get_positions()
+
+    async def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        await self._delay()
+        return self.broker.get_latest_prices(symbols)
+
+    async def place_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        limit_price: float | None = None,
+        client_order_id: str | None = None,
+    ) -> dict[str, Any]:
+        await self._delay()
+        return self.broker.place_order(symbol, side, qty, order_type, limit_price, client_order_id)
+
+    async def get_order_by_client_id(self, client_order_id: str) -> dict[str, Any] | None:
+        await self._delay()
+        return self.broker.get_order_by_client_id(client_order_id)
+
+    async def cancel_order(self, order_id: str) -> dict[str, Any]:
+        await self._delay()
+        return self.broker.cancel_order(order_id)
+
+
+class AsyncAlpacaCryptoBroker(AsyncBrokerAdapter):
+    def __init__(self, client: httpx.AsyncClient | None = None) -> None:
+        self.headers = alpaca_headers()
+        self.base_url = settings.alpaca_base_url.rstrip("/")
+        self.client = client or httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=alpaca_client_timeout(),
+            limits=alpaca_client_limits(),
+            http2=settings.alpaca_http2,
+        )
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        payload: dict[str, Any] | None = None,
+        params: dict[str, str] | None = None,
+    ) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.client.request(method, path, json=payload, params=params)
+            status = str(response.status_code)
+        finally:
+            observe_request(method, path, status, time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_account(self) -> Account:
+        data = await self._request("GET", "/v2/account")
+        return Account(equity=float(data["equity"]), cash=float(data["cash"]))
+
+    async def get_positions(self) -> list[dict[str, Any]]:
+        return await self._request("GET", "/v2/positions")
+
+    async def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        if not symbols:
+            return {}
+        data = await self._request(
+            "GET", "/v1beta3/crypto/us/latest/quotes", params={"symbols": ",".join(symbols)}
+        )
+        return parse_latest_prices(data, symbols)
+
+    async def place_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        limit_price: float | None = None,
+        client_order_id: str | None = None,
+    ) -> dict[str, Any]:
+        payload = alpaca_order_payload(symbol, side, qty, order_type, limit_price, client_order_id)
+        try:
+            return await self._request("POST", "/v2/orders", payload)
+        except httpx.HTTPStatusError as error:
+            if client_order_id is not None and is_duplicate_client_order_id(error):
+                raise DuplicateClientOrderId(client_order_id) from error
+            raise
+
+    async def get_order_by_client_id(self, client_order_id: str) -> dict[str, Any] | None:
+        try:
+            return await self._request(
+                "GET",
+                "/v2/orders:by_client_order_id",
+                params={"client_order_id": client_order_id},
+            )
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code == 404:
+                return None
+            raise
+
+    async def cancel_order(self, order_id: str) -> dict[str, Any]:
+        return await self._request("DELETE", f"/v2/orders/{order_id}")
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
 def build_broker() -> BrokerAdapter:
     if settings.alpaca_api_key and settings.alpaca_secret_key:
         return AlpacaCryptoBroker()
     return BrokerMock()
+
+
+def build_async_broker(broker: BrokerAdapter | None = None) -> AsyncBrokerAdapter:
+    if isinstance(broker, BrokerMock):
+        return AsyncBrokerMock(broker)
+    if settings.alpaca_api_key and settings.alpaca_secret_key:
+        return AsyncAlpacaCryptoBroker()
+    return AsyncBrokerMock()
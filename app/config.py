@@ -9,12 +9,45 @@ from pathlib import Path
 class Settings:
     app_name: str = "KudanForge"
     db_path: str = os.getenv("KUDAN_DB_PATH", "/data/kudan.sqlite")
+    bar_store_path: str = os.getenv("KUDAN_BAR_STORE_PATH", "/data/bars")
+    archive_path: str = os.getenv("KUDAN_ARCHIVE_PATH", "/data/archive")
+    retention_raw_days: float = float(os.getenv("RETENTION_RAW_DAYS", "14"))
+    retention_interval_hours: float = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+    db_cache_size_kib: int = int(os.getenv("KUDAN_DB_CACHE_KIB", "16384"))
+    db_mmap_size_bytes: int = int(os.getenv("KUDAN_DB_MMAP_BYTES", str(256 * 1024 * 1024)))
+    db_busy_timeout_ms: int = int(os.getenv("KUDAN_DB_BUSY_TIMEOUT_MS", "5000"))
+    db_statement_cache_size: int = int(os.getenv("KUDAN_DB_STATEMENT_CACHE", "256"))
     live_trading_env: bool = os.getenv("LIVE_TRADING", "false").lower() == "true"
     scheduler_enabled: bool = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
     scheduler_interval_seconds: int = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "60"))
     alpaca_api_key: str | None = os.getenv("ALPACA_API_KEY")
     alpaca_secret_key: str | None = os.getenv("ALPACA_SECRET_KEY")
     alpaca_base_url: str = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")
+    alpaca_timeout_seconds: float = float(os.getenv("ALPACA_TIMEOUT_SECONDS", "10"))
+    alpaca_connect_timeout_seconds: float = float(os.getenv("ALPACA_CONNECT_TIMEOUT_SECONDS", "5"))
+    alpaca_http2: bool = os.getenv("ALPACA_HTTP2", "false").lower() == "true"
+    alpaca_max_connections: int = int(os.getenv("ALPACA_MAX_CONNECTIONS", "20"))
+    alpaca_max_keepalive_connections: int = int(os.getenv("ALPACA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    alpaca_keepalive_expiry_seconds: float = float(os.getenv("ALPACA_KEEPALIVE_EXPIRY", "30"))
+    audit_flush_interval_seconds: float = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "2"))
+    market_stream: str = os.getenv("MARKET_STREAM", "off").lower()
+    alpaca_stream_url: str = os.getenv(
+        "ALPACA_STREAM_URL", "wss://stream.data.alpaca.markets/v1beta3/crypto/us"
+    )
+    market_stream_max_quote_age_seconds: float = float(
+        os.getenv("MARKET_STREAM_MAX_QUOTE_AGE_SECONDS", "5")
+    )
+    market_stream_quote_capacity: int = int(os.getenv("MARKET_STREAM_QUOTE_CAPACITY", "4096"))
+    market_stream_bar_capacity: int = int(os.getenv("MARKET_STREAM_BAR_CAPACITY", "1440"))
+    order_max_concurrency: int = int(os.getenv("ORDER_MAX_CONCURRENCY", "8"))
+    order_max_retries: int = int(os.getenv("ORDER_MAX_RETRIES", "2"))
+    order_retry_backoff_seconds: float = float(os.getenv("ORDER_RETRY_BACKOFF_SECONDS", "0.25"))
+    market_snapshot_ttl_seconds: float = float(os.getenv("MARKET_SNAPSHOT_TTL_SECONDS", "30"))
+    event_heartbeat_seconds: float = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+    state_snapshot_max_age_seconds: float = float(os.getenv("STATE_SNAPSHOT_MAX_AGE_SECONDS", "15"))
+    strategy_plugins: tuple[str, ...] = tuple(
+        m.strip() for m in os.getenv("STRATEGY_PLUGINS", "").split(",") if m.strip()
+    )
     llm_api_key: str | None = os.getenv("LLM_API_KEY")
 
     max_drawdown_from_peak: float = float(os.getenv("RISK_MAX_DRAWDOWN", "0.25"))
@@ -22,6 +55,8 @@ class Settings:
     per_trade_risk: float = float(os.getenv("RISK_PER_TRADE", "0.0025"))
     max_gross_exposure: float = float(os.getenv("RISK_MAX_GROSS_EXPOSURE", "1.0"))
     max_orders_per_hour: int = int(os.getenv("RISK_MAX_ORDERS_PER_HOUR", "30"))
+    min_order_notional: float = float(os.getenv("MIN_ORDER_NOTIONAL", "1"))
+    rebalance_band: float = float(os.getenv("REBALANCE_BAND", "0.001"))
 
     @property
     def db_dir(self) -> Path:
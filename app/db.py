@@ -2,21 +2,75 @@ from __future__ import annotations
 
 import json
 import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
 from contextlib import contextmanager
-from datetime import UTC, datetime
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
 from app.config import settings
 
+_local = threading.local()
+_connections: dict[threading.Thread, sqlite3.Connection] = {}
+_connections_lock = threading.Lock()
+_generation = 0
+
 
 def utcnow_iso() -> str:
     return datetime.now(UTC).isoformat()
 
 
+def connect(path: str | None = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path or settings.db_path,
+        check_same_thread=False,
+        cached_statements=settings.db_statement_cache_size,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {settings.db_busy_timeout_ms}")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA cache_size = -{settings.db_cache_size_kib}")
+    conn.execute(f"PRAGMA mmap_size = {settings.db_mmap_size_bytes}")
+    return conn
+
+
+def _thread_conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.key == (settings.db_path, _generation):
+        return conn
+    conn = connect()
+    _local.conn = conn
+    _local.key = (settings.db_path, _generation)
+    current = threading.current_thread()
+    with _connections_lock:
+        for thread in [t for t in _connections if not t.is_alive()]:
+            _connections.pop(thread).close()
+        previous = _connections.pop(current, None)
+        if previous is not None:
+            previous.close()
+        _connections[current] = conn
+    return conn
+
+
+def close_all() -> None:
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
+    state.close()
+
+
 def init_db() -> None:
     Path(settings.db_dir).mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(settings.db_path) as conn:
+    close_all()
+    with get_conn() as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS config_state (
@@ -71,10 +125,44 @@ def init_db() -> None:
                 qty REAL NOT NULL,
                 status TEXT NOT NULL,
                 broker_order_id TEXT,
-                reason TEXT
+                reason TEXT,
+                client_order_id TEXT,
+                broker_status TEXT,
+                notional REAL
+            )
+            """
+        )
+        ensure_columns(
+            conn,
+            "orders",
+            {"client_order_id": "TEXT", "broker_status": "TEXT", "notional": "REAL"},
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)")
+        for table, column in (
+            ("runs", "created_at"),
+            ("runs", "status"),
+            ("orders", "run_id"),
+            ("orders", "symbol"),
+            ("orders", "status"),
+            ("risk_events", "created_at"),
+            ("risk_events", "reason"),
+        ):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column})")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sweep_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sweep_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                params TEXT NOT NULL,
+                metrics TEXT NOT NULL
             )
             """
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sweep_results_sweep_id ON sweep_results(sweep_id)"
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS position_snapshots (
@@ -86,11 +174,98 @@ def init_db() -> None:
             )
             """
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_position_snapshots_created_at "
+            "ON position_snapshots(created_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS run_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                status TEXT NOT NULL,
+                runs INTEGER NOT NULL,
+                PRIMARY KEY (granularity, bucket, status)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                status TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                orders INTEGER NOT NULL,
+                qty REAL NOT NULL,
+                notional REAL NOT NULL,
+                PRIMARY KEY (granularity, bucket, symbol, status, reason)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS risk_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                level TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                events INTEGER NOT NULL,
+                PRIMARY KEY (granularity, bucket, level, reason)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archive_segments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                first_id INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                start_at TEXT NOT NULL,
+                end_at TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_archive_segments_range "
+            "ON archive_segments(table_name, start_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("INSERT OR IGNORE INTO table_versions(name, version) VALUES ('strategies', 0)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS strategies_version_{event.lower()}
+                AFTER {event} ON strategies
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = 'strategies';
+                END
+                """
+            )
         conn.commit()
         ensure_default_state(conn)
         ensure_default_strategies(conn)
 
 
+def ensure_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
 def ensure_default_state(conn: sqlite3.Connection) -> None:
     for key, value in {
         "armed_live": "false",
@@ -121,30 +296,89 @@ def ensure_default_strategies(conn: sqlite3.Connection) -> None:
 
 @contextmanager
 def get_conn() -> Any:
-    conn = sqlite3.connect(settings.db_path)
-    conn.row_factory = sqlite3.Row
+    conn = _thread_conn()
     try:
         yield conn
         conn.commit()
-    finally:
-        conn.close()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+class StateStore:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._conn_key: tuple[str, int] | None = None
+        self._values: dict[str, str] = {}
+        self._data_version = -1
+
+    def _connection(self) -> sqlite3.Connection:
+        key = (settings.db_path, _generation)
+        if self._conn is None or self._conn_key != key:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = connect()
+            self._conn_key = key
+            self._data_version = -1
+        return self._conn
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            rows = conn.execute("SELECT key, value FROM config_state").fetchall()
+            self._values = {row[0]: row[1] for row in rows}
+            self._data_version = version
+
+    def get(self, key: str, default: str = "") -> str:
+        with self._lock:
+            self._sync(self._connection())
+            return self._values.get(key, default)
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        return self.get(key, "true" if default else "false") == "true"
+
+    def get_float(self, key: str, default: float) -> float:
+        return float(self.get(key, str(default)))
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO config_state(key, value, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value=excluded.value, updated_at=excluded.updated_at
+                    """,
+                    (key, value, utcnow_iso()),
+                )
+            self._values[key] = value
+
+    def set_bool(self, key: str, value: bool) -> None:
+        self.set(key, "true" if value else "false")
+
+    def set_float(self, key: str, value: float) -> None:
+        self.set(key, str(value))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._data_version = -1
+
+
+state = StateStore()
 
 
 def get_state(key: str, default: str = "") -> str:
-    with get_conn() as conn:
-        row = conn.execute("SELECT value FROM config_state WHERE key = ?", (key,)).fetchone()
-        return row[0] if row else default
+    return state.get(key, default)
 
 
 def set_state(key: str, value: str) -> None:
-    with get_conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO config_state(key, value, updated_at) VALUES (?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at
-            """,
-            (key, value, utcnow_iso()),
-        )
+    state.set(key, value)
 
 
 def list_strategies() -> list[dict[str, Any]]:
@@ -153,6 +387,12 @@ def list_strategies() -> list[dict[str, Any]]:
         return [dict(r) for r in rows]
 
 
+def table_version(name: str) -> tuple[int, int]:
+    with get_conn() as conn:
+        row = conn.execute("SELECT version FROM table_versions WHERE name = ?", (name,)).fetchone()
+        return _generation, row[0] if row else 0
+
+
 def update_strategy_mode(strategy_id: int, mode: str) -> None:
     with get_conn() as conn:
         conn.execute("UPDATE strategies SET mode = ? WHERE id = ?", (mode, strategy_id))
@@ -168,14 +408,7 @@ def insert_run(status: str, summary: str, details: dict[str, Any]) -> int:
 
 
 def list_runs(limit: int = 50) -> list[dict[str, Any]]:
-    with get_conn() as conn:
-        rows = conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
-        out: list[dict[str, Any]] = []
-        for row in rows:
-            item = dict(row)
-            item["details"] = json.loads(item["details"])
-            out.append(item)
-        return out
+    return list_history("runs", limit=limit)
 
 
 def insert_risk_event(level: str, reason: str, context: dict[str, Any]) -> None:
@@ -186,18 +419,19 @@ def insert_risk_event(level: str, reason: str, context: dict[str, Any]) -> None:
         )
 
 
-def list_risk_events(limit: int = 50) -> list[dict[str, Any]]:
+def insert_risk_events(events: list[tuple[str, str, dict[str, Any]]]) -> None:
+    if not events:
+        return
+    now = utcnow_iso()
     with get_conn() as conn:
-        rows = conn.execute(
-            "SELECT * FROM risk_events ORDER BY id DESC LIMIT ?",
-            (limit,),
-        ).fetchall()
-        out = []
-        for row in rows:
-            item = dict(row)
-            item["context"] = json.loads(item["context"])
-            out.append(item)
-        return out
+        conn.executemany(
+            "INSERT INTO risk_events(created_at, level, reason, context) VALUES (?, ?, ?, ?)",
+            [(now, level, reason, json.dumps(context)) for level, reason, context in events],
+        )
+
+
+def list_risk_events(limit: int = 50) -> list[dict[str, Any]]:
+    return list_history("risk_events", limit=limit)
 
 
 def insert_order(
@@ -220,15 +454,213 @@ def insert_order(
         )
 
 
-def orders_in_last_hour() -> int:
+def start_run() -> int:
+    with get_conn() as conn:
+        cur = conn.execute(
+            "INSERT INTO runs(created_at, status, summary, details) VALUES (?, ?, ?, ?)",
+            (utcnow_iso(), "running", "Cycle started", "{}"),
+        )
+        return int(cur.lastrowid)
+
+
+def insert_audit_batch(
+    run: tuple[str, str, str, dict[str, Any]] | None,
+    orders: list[tuple[Any, ...]],
+    risk_events: list[tuple[str, str, str, dict[str, Any]]],
+    run_id: int | None = None,
+) -> int | None:
+    with get_conn() as conn:
+        if run is not None and run_id is not None:
+            _, status, summary, details = run
+            conn.execute(
+                "UPDATE runs SET status = ?, summary = ?, details = ? WHERE id = ?",
+                (status, summary, json.dumps(details), run_id),
+            )
+        elif run is not None:
+            created_at, status, summary, details = run
+            cur = conn.execute(
+                "INSERT INTO runs(created_at, status, summary, details) VALUES (?, ?, ?, ?)",
+                (created_at, status, summary, json.dumps(details)),
+            )
+            run_id = int(cur.lastrowid)
+        conn.executemany(
+            """
+            INSERT INTO orders(
+                run_id, created_at, symbol, side, qty, status, broker_order_id, reason,
+                client_order_id, broker_status, notional
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(run_id, *order) for order in orders],
+        )
+        conn.executemany(
+            "INSERT INTO risk_events(created_at, level, reason, context) VALUES (?, ?, ?, ?)",
+            [
+                (created_at, level, reason, json.dumps(context))
+                for created_at, level, reason, context in risk_events
+            ],
+        )
+        return run_id
+
+
+def insert_position_snapshots(rows: list[tuple[str, str, float, float]]) -> None:
+    with get_conn() as conn:
+        conn.executemany(
+            """
+            INSERT INTO position_snapshots(created_at, symbol, qty, market_value)
+            VALUES (?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+
+def submitted_order_times_since(since: str) -> list[str]:
     with get_conn() as conn:
-        row = conn.execute(
-            "SELECT COUNT(*) FROM orders WHERE datetime(created_at) >= datetime('now', '-1 hour')"
-        ).fetchone()
-        return int(row[0])
+        rows = conn.execute(
+            "SELECT created_at FROM orders WHERE created_at >= ? AND status = 'submitted'",
+            (since,),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+
+def orders_in_last_hour() -> int:
+    return len(submitted_order_times_since((datetime.now(UTC) - timedelta(hours=1)).isoformat()))
 
 
 def list_orders(limit: int = 100) -> list[dict[str, Any]]:
+    return list_history("orders", limit=limit)
+
+
+@dataclass(frozen=True, slots=True)
+class HistoryTable:
+    columns: tuple[str, ...]
+    blobs: tuple[str, ...] = ()
+    filters: tuple[str, ...] = ()
+
+
+HISTORY_TABLES = {
+    "runs": HistoryTable(
+        ("id", "created_at", "status", "summary", "details"), ("details",), ("status",)
+    ),
+    "orders": HistoryTable(
+        (
+            "id",
+            "run_id",
+            "created_at",
+            "symbol",
+            "side",
+            "qty",
+            "status",
+            "broker_order_id",
+            "reason",
+            "client_order_id",
+            "broker_status",
+            "notional",
+        ),
+        filters=("run_id", "symbol", "status"),
+    ),
+    "risk_events": HistoryTable(
+        ("id", "created_at", "level", "reason", "context"), ("context",), ("level", "reason")
+    ),
+}
+
+
+def history_query(
+    table: str,
+    before_id: int | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    filters: dict[str, Any] | None = None,
+    fields: Iterable[str] | None = None,
+    limit: int | None = None,
+) -> tuple[str, list[Any]]:
+    spec = HISTORY_TABLES[table]
+    columns = spec.columns if fields is None else tuple(dict.fromkeys(("id", *fields)))
+    unknown = [c for c in columns if c not in spec.columns]
+    if unknown:
+        raise ValueError(f"Unknown {table} fields: {', '.join(unknown)}")
+    clauses: list[str] = []
+    params: list[Any] = []
+    for clause, value in (
+        ("id < ?", before_id),
+        ("created_at >= ?", since),
+        ("created_at < ?", until),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    for key, value in (filters or {}).items():
+        if key not in spec.filters:
+            raise ValueError(f"Cannot filter {table} by {key}")
+        if value is not None:
+            clauses.append(f"{key} = ?")
+            params.append(value)
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def decode_history_row(table: str, row: sqlite3.Row) -> dict[str, Any]:
+    item = dict(row)
+    for blob in HISTORY_TABLES[table].blobs:
+        if blob in item:
+            item[blob] = json.loads(item[blob])
+    return item
+
+
+def list_history(table: str, limit: int = 50, **query: Any) -> list[dict[str, Any]]:
+    sql, params = history_query(table, limit=limit, **query)
     with get_conn() as conn:
-        rows = conn.execute("SELECT * FROM orders ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
-        return [dict(r) for r in rows]
+        return [decode_history_row(table, row) for row in conn.execute(sql, params)]
+
+
+def ndjson_line(blobs: tuple[str, ...], row: sqlite3.Row) -> str:
+    item = dict(row)
+    raw = {blob: item.pop(blob) for blob in blobs if blob in item}
+    line = json.dumps(item, separators=(",", ":"))
+    if raw:
+        line = line[:-1] + "".join(f',"{key}":{value}' for key, value in raw.items()) + "}"
+    return line + "\n"
+
+
+def iter_history_ndjson(table: str, batch_size: int = 500, **query: Any) -> Iterator[bytes]:
+    sql, params = history_query(table, **query)
+    blobs = HISTORY_TABLES[table].blobs
+    conn = connect()
+    try:
+        cursor = conn.execute(sql, params)
+        while rows := cursor.fetchmany(batch_size):
+            yield "".join(ndjson_line(blobs, row) for row in rows).encode()
+    finally:
+        conn.close()
+
+
+def insert_sweep_result(
+    sweep_id: str, strategy: str, params: dict[str, Any], metrics: dict[str, Any]
+) -> None:
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO sweep_results(sweep_id, created_at, strategy, params, metrics)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (sweep_id, utcnow_iso(), strategy, json.dumps(params), json.dumps(metrics)),
+        )
+
+
+def list_sweep_results(sweep_id: str) -> list[dict[str, Any]]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT * FROM sweep_results WHERE sweep_id = ? ORDER BY id", (sweep_id,)
+        ).fetchall()
+        out = []
+        for row in rows:
+            item = dict(row)
+            item["params"] = json.loads(item["params"])
+            item["metrics"] = json.loads(item["metrics"])
+            out.append(item)
+        return out
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    id: int
+    type: str
+    data: dict[str, Any]
+    encoded: bytes = field(repr=False, compare=False)
+
+    @classmethod
+    def build(cls, event_id: int, event_type: str, data: dict[str, Any]) -> Event:
+        payload = json.dumps(data, default=str, separators=(",", ":"))
+        encoded = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+        return cls(event_id, event_type, data, encoded)
+
+
+class Subscription:
+    def __init__(self, bus: EventBus, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.bus = bus
+        self.loop = loop
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def stream(self, heartbeat_seconds: float | None = None) -> AsyncIterator[bytes]:
+        heartbeat = (
+            settings.event_heartbeat_seconds if heartbeat_seconds is None else heartbeat_seconds
+        )
+        try:
+            yield b"retry: 3000\n\n"
+            while not self.overflowed:
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), heartbeat)
+                except TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield event.encoded
+        finally:
+            self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, history: int = 256, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self._history: deque[Event] = deque(maxlen=history)
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def publish(self, event_type: str, data: dict[str, Any]) -> Event:
+        with self._lock:
+            event = Event.build(self._next_id, event_type, data)
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id: str | None = None) -> Subscription:
+        subscription = Subscription(self, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if last_event_id is not None and last_event_id.isdigit():
+                for event in self._history:
+                    if event.id > int(last_event_id):
+                        subscription.put(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def recent(self, event_type: str | None = None) -> list[Event]:
+        with self._lock:
+            return [e for e in self._history if event_type is None or e.type == event_type]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+bus = EventBus()
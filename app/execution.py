@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import httpx
+
+from app.broker import AsyncBrokerAdapter, BrokerAdapter, DuplicateClientOrderId
+from app.config import settings
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def client_order_id(run_id: int, strategies: Iterable[str], symbol: str) -> str:
+    return f"kf-{run_id}-{symbol}-{'+'.join(sorted(strategies))}"[:128]
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+def retry_delay(attempt: int, backoff_seconds: float) -> float:
+    return backoff_seconds * 2**attempt * random.uniform(0.5, 1.5)
+
+
+def apply_result(decision: dict[str, Any], result: dict[str, Any] | BaseException) -> None:
+    if isinstance(result, BaseException):
+        decision.update(status="failed", reasons=[f"{type(result).__name__}: {result}"])
+        return
+    decision.update(
+        status="submitted",
+        order_id=result.get("id"),
+        broker_status=result.get("status"),
+        side=result.get("side") or decision["side"],
+        qty=float(result.get("qty") or decision["qty"]),
+    )
+
+
+class OrderExecutor:
+    def __init__(
+        self,
+        broker: BrokerAdapter,
+        async_broker: AsyncBrokerAdapter,
+        max_concurrency: int | None = None,
+        max_retries: int | None = None,
+        backoff_seconds: float | None = None,
+    ) -> None:
+        self.broker = broker
+        self.async_broker = async_broker
+        self.max_concurrency = max_concurrency or settings.order_max_concurrency
+        self.max_retries = settings.order_max_retries if max_retries is None else max_retries
+        self.backoff_seconds = (
+            settings.order_retry_backoff_seconds if backoff_seconds is None else backoff_seconds
+        )
+        self._pool: ThreadPoolExecutor | None = None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def submit(self, run_id: int, decisions: list[dict[str, Any]]) -> None:
+        for decision in decisions:
+            decision["client_order_id"] = self._client_order_id(run_id, decision)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="orders")
+        futures = [self._pool.submit(self._place, decision) for decision in decisions]
+        for decision, future in zip(decisions, futures, strict=True):
+            error = future.exception()
+            apply_result(decision, error if error is not None else future.result())
+
+    async def submit_async(self, run_id: int, decisions: list[dict[str, Any]]) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def place(decision: dict[str, Any]) -> dict[str, Any]:
+            async with semaphore:
+                return await self._place_async(decision)
+
+        for decision in decisions:
+            decision["client_order_id"] = self._client_order_id(run_id, decision)
+        results = await asyncio.gather(*(place(d) for d in decisions), return_exceptions=True)
+        for decision, result in zip(decisions, results, strict=True):
+            apply_result(decision, result)
+
+    def _client_order_id(self, run_id: int, decision: dict[str, Any]) -> str:
+        return client_order_id(run_id, decision.get("strategies", {}), decision["symbol"])
+
+    def _lookup(self, order_id: str) -> dict[str, Any] | None:
+        try:
+            return self.broker.get_order_by_client_id(order_id)
+        except httpx.HTTPError:
+            return None
+
+    async def _lookup_async(self, order_id: str) -> dict[str, Any] | None:
+        try:
+            return await self.async_broker.get_order_by_client_id(order_id)
+        except httpx.HTTPError:
+            return None
+
+    def _place(self, decision: dict[str, Any]) -> dict[str, Any]:
+        order_id = decision["client_order_id"]
+        attempt = 0
+        while True:
+            try:
+                return self.broker.place_order(
+                    decision["symbol"],
+                    decision["side"],
+                    decision["qty"],
+                    "market",
+                    client_order_id=order_id,
+                )
+            except DuplicateClientOrderId:
+                existing = self.broker.get_order_by_client_id(order_id)
+                if existing is None:
+                    raise
+                return existing
+            except httpx.HTTPError as error:
+                if not is_retryable(error):
+                    raise
+                if attempt >= self.max_retries:
+                    existing = self._lookup(order_id)
+                    if existing is None:
+                        raise
+                    return existing
+            time.sleep(retry_delay(attempt, self.backoff_seconds))
+            attempt += 1
+
+    async def _place_async(self, decision: dict[str, Any]) -> dict[str, Any]:
+        order_id = decision["client_order_id"]
+        attempt = 0
+        while True:
+            try:
+                return await self.async_broker.place_order(
+                    decision["symbol"],
+                    decision["side"],
+                    decision["qty"],
+                    "market",
+                    client_order_id=order_id,
+                )
+            except DuplicateClientOrderId:
+                existing = await self.async_broker.get_order_by_client_id(order_id)
+                if existing is None:
+                    raise
+                return existing
+            except httpx.HTTPError as error:
+                if not is_retryable(error):
+                    raise
+                if attempt >= self.max_retries:
+                    existing = await self._lookup_async(order_id)
+                    if existing is None:
+                        raise
+                    return existing
+            await asyncio.sleep(retry_delay(attempt, self.backoff_seconds))
+            attempt += 1
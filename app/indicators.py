@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+
+
+class SMA:
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._values: deque[float] = deque()
+        self._sum = 0.0
+        self.value = math.nan
+
+    @property
+    def ready(self) -> bool:
+        return len(self._values) == self.window
+
+    def update(self, x: float) -> float:
+        self._values.append(x)
+        self._sum += x
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+        self.value = self._sum / len(self._values)
+        return self.value
+
+
+class EMA:
+    def __init__(self, span: int) -> None:
+        self.alpha = 2.0 / (span + 1)
+        self.value = math.nan
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    def update(self, x: float) -> float:
+        self.value = x if math.isnan(self.value) else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class RollingVariance:
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._values: deque[float] = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return len(self._values) == self.window
+
+    @property
+    def value(self) -> float:
+        n = len(self._values)
+        return max(self._m2, 0.0) / (n - 1) if n > 1 else 0.0
+
+    def update(self, x: float) -> float:
+        self._values.append(x)
+        n = len(self._values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self._m2 += delta * (x - self.mean)
+        if n > self.window:
+            old = self._values.popleft()
+            n -= 1
+            delta = old - self.mean
+            self.mean -= delta / n
+            self._m2 -= delta * (old - self.mean)
+        return self.value
+
+
+class ZScore:
+    def __init__(self, window: int) -> None:
+        self.variance = RollingVariance(window)
+        self.value = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.variance.ready
+
+    def update(self, x: float) -> float:
+        std = math.sqrt(self.variance.update(x))
+        self.value = (x - self.variance.mean) / std if std > 0 else 0.0
+        return self.value
+
+
+class RollingMax:
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._count = 0
+        self._candidates: deque[tuple[int, float]] = deque()
+        self.value = math.nan
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.window
+
+    def _dominates(self, new: float, old: float) -> bool:
+        return new >= old
+
+    def update(self, x: float) -> float:
+        while self._candidates and self._dominates(x, self._candidates[-1][1]):
+            self._candidates.pop()
+        self._candidates.append((self._count, x))
+        self._count += 1
+        if self._candidates[0][0] <= self._count - 1 - self.window:
+            self._candidates.popleft()
+        self.value = self._candidates[0][1]
+        return self.value
+
+
+class RollingMin(RollingMax):
+    def _dominates(self, new: float, old: float) -> bool:
+        return new <= old
+
+
+class Returns:
+    def __init__(self, period: int = 1) -> None:
+        self.period = period
+        self._values: deque[float] = deque(maxlen=period + 1)
+        self.value = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return len(self._values) == self._values.maxlen
+
+    def update(self, x: float) -> float:
+        self._values.append(x)
+        first = self._values[0]
+        self.value = x / first - 1.0 if first else 0.0
+        return self.value
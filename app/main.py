@@ -1,17 +1,32 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
-
-from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from typing import Any, Literal
+
+from fastapi import FastAPI, Form, Query, Request
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.templating import Jinja2Templates
 
 from app import db
 from app.config import settings
+from app.events import bus
 from app.llm import LLMProvider
+from app.metrics import registry
+from app.retention import iter_archive, list_rollups
 from app.risk import ensure_live_gate
 from app.runner import Scheduler, StrategyRunner
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 1000
+
 app = FastAPI(title=settings.app_name)
 templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
 runner = StrategyRunner()
@@ -22,49 +37,167 @@ llm_provider = LLMProvider()
 @app.on_event("startup")
 def startup() -> None:
     db.init_db()
+    runner.order_rate.rebuild()
+    runner.start_stream()
     scheduler.start()
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    scheduler.stop()
+    runner.close()
+    await runner.async_broker.aclose()
+    db.close_all()
+
+
 @app.get("/healthz")
 def healthz() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/state")
-def api_state() -> dict:
-    account = runner.broker.get_account()
-    positions = runner.broker.get_positions()
-    exposure = sum(abs(float(p["market_value"])) for p in positions)
-    peak = float(db.get_state("peak_equity", str(account.equity)))
-    drawdown = 0.0 if peak <= 0 else max(0.0, (peak - account.equity) / peak)
-    day_start = float(db.get_state("day_start_equity", str(account.equity)))
-    daily_pnl = account.equity - day_start
-    return {
-        "equity": account.equity,
-        "drawdown": drawdown,
-        "daily_pnl": daily_pnl,
-        "exposure": exposure,
-        "positions": positions,
-        "mode": "live" if ensure_live_gate().allowed else "paper",
-        "kill_switch": db.get_state("kill_switch", "false") == "true",
-        "armed": db.get_state("armed_live", "false") == "true",
+def api_state(request: Request) -> Response:
+    snapshot = runner.state_snapshot()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(snapshot.body(), headers=headers)
+
+
+@app.get("/api/events")
+async def events(request: Request) -> StreamingResponse:
+    subscription = bus.subscribe(request.headers.get("last-event-id"))
+    return StreamingResponse(
+        subscription.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def history_response(
+    table: str,
+    filters: dict[str, Any],
+    before_id: int | None,
+    since: str | None,
+    until: str | None,
+    fields: str | None,
+    limit: int | None,
+    format: str,
+) -> Response:
+    query = {
+        "before_id": before_id,
+        "since": since,
+        "until": until,
+        "filters": filters,
+        "fields": fields.split(",") if fields else None,
     }
+    try:
+        if format == "ndjson":
+            db.history_query(table, **query)
+            return StreamingResponse(
+                db.iter_history_ndjson(table, limit=limit, **query),
+                media_type="application/x-ndjson",
+            )
+        limit = min(limit or HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+        items = db.list_history(table, limit=limit, **query)
+    except ValueError as exc:
+        return JSONResponse({"status": "error", "message": str(exc)}, status_code=400)
+    next_before_id = items[-1]["id"] if len(items) == limit else None
+    return JSONResponse({"items": items, "next_before_id": next_before_id})
+
+
+@app.get("/api/runs")
+def api_runs(
+    before_id: int | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    status: str | None = None,
+    fields: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    format: Literal["json", "ndjson"] = "json",
+) -> Response:
+    return history_response(
+        "runs", {"status": status}, before_id, since, until, fields, limit, format
+    )
+
+
+@app.get("/api/orders")
+def api_orders(
+    before_id: int | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    symbol: str | None = None,
+    status: str | None = None,
+    run_id: int | None = None,
+    fields: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    format: Literal["json", "ndjson"] = "json",
+) -> Response:
+    filters = {"symbol": symbol, "status": status, "run_id": run_id}
+    return history_response("orders", filters, before_id, since, until, fields, limit, format)
+
+
+@app.get("/api/risk_events")
+def api_risk_events(
+    before_id: int | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    level: str | None = None,
+    reason: str | None = None,
+    fields: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    format: Literal["json", "ndjson"] = "json",
+) -> Response:
+    filters = {"level": level, "reason": reason}
+    return history_response("risk_events", filters, before_id, since, until, fields, limit, format)
+
+
+@app.get("/api/archive/{table}")
+def api_archive(
+    table: Literal["runs", "orders", "risk_events", "position_snapshots"],
+    since: str | None = None,
+    until: str | None = None,
+) -> StreamingResponse:
+    lines = (
+        json.dumps(item, separators=(",", ":")).encode() + b"\n"
+        for item in iter_archive(table, since, until)
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@app.get("/api/rollups/{table}")
+def api_rollups(
+    table: Literal["runs", "orders", "risk_events"],
+    granularity: Literal["hour", "day"] = "hour",
+    since: str | None = None,
+    until: str | None = None,
+) -> list[dict[str, Any]]:
+    return list_rollups(table, granularity, since, until)
 
 
 @app.post("/api/run_once")
-def run_once() -> dict:
-    return runner.run_once()
+async def run_once() -> dict:
+    result = await runner.run_once_async()
+    runner.states.invalidate()
+    return result
 
 
 @app.post("/api/kill_switch/enable")
 def kill_enable() -> dict[str, str]:
-    db.set_state("kill_switch", "true")
+    db.state.set_bool("kill_switch", True)
+    runner.states.invalidate()
     return {"status": "enabled"}
 
 
 @app.post("/api/kill_switch/disable")
 def kill_disable() -> dict[str, str]:
-    db.set_state("kill_switch", "false")
+    db.state.set_bool("kill_switch", False)
+    runner.states.invalidate()
     return {"status": "disabled"}
 
 
@@ -75,13 +208,15 @@ def arm_live(phrase: str = Form(...)) -> JSONResponse:
             {"status": "error", "message": "Invalid arming phrase"},
             status_code=400,
         )
-    db.set_state("armed_live", "true")
+    db.state.set_bool("armed_live", True)
+    runner.states.invalidate()
     return JSONResponse({"status": "armed"})
 
 
 @app.post("/api/disarm_live")
 def disarm_live() -> dict[str, str]:
-    db.set_state("armed_live", "false")
+    db.state.set_bool("armed_live", False)
+    runner.states.invalidate()
     return {"status": "disarmed"}
 
 
@@ -97,46 +232,53 @@ def promote_strategy(strategy_id: int, mode: str = Form("paper")) -> JSONRespons
 
 @app.get("/", response_class=HTMLResponse)
 def dashboard(request: Request) -> HTMLResponse:
-    state = api_state()
+    state = runner.state_snapshot().body()
     runs = db.list_runs(10)
     return templates.TemplateResponse(
+        request,
         "dashboard.html",
-        {"request": request, "state": state, "runs": runs},
+        {"state": state, "runs": runs},
     )
 
 
 @app.get("/chat", response_class=HTMLResponse)
 def chat_get(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("chat.html", {"request": request, "response": None})
+    return templates.TemplateResponse(request, "chat.html", {"response": None})
 
 
 @app.post("/chat", response_class=HTMLResponse)
 def chat_post(request: Request, prompt: str = Form(...)) -> HTMLResponse:
     response = llm_provider.chat(prompt)
-    return templates.TemplateResponse("chat.html", {"request": request, "response": response})
+    return templates.TemplateResponse(request, "chat.html", {"response": response})
 
 
 @app.get("/strategies", response_class=HTMLResponse)
 def strategies(request: Request) -> HTMLResponse:
     items = db.list_strategies()
-    return templates.TemplateResponse("strategies.html", {"request": request, "strategies": items})
+    return templates.TemplateResponse(request, "strategies.html", {"strategies": items})
 
 
 @app.get("/runs", response_class=HTMLResponse)
-def runs(request: Request) -> HTMLResponse:
+def runs(request: Request, before_id: int | None = None) -> HTMLResponse:
+    items = db.list_history("runs", limit=HISTORY_PAGE_SIZE, before_id=before_id)
+    next_before_id = items[-1]["id"] if len(items) == HISTORY_PAGE_SIZE else None
     return templates.TemplateResponse(
+        request,
         "runs.html",
-        {"request": request, "runs": db.list_runs(), "risk_events": db.list_risk_events()},
+        {
+            "runs": items,
+            "next_before_id": next_before_id,
+            "risk_events": db.list_risk_events(),
+        },
     )
 
 
 @app.get("/settings", response_class=HTMLResponse)
 def settings_view(request: Request) -> HTMLResponse:
     context = {
-        "request": request,
         "live_trading_env": settings.live_trading_env,
-        "armed": db.get_state("armed_live", "false") == "true",
-        "kill_switch": db.get_state("kill_switch", "false") == "true",
+        "armed": db.state.get_bool("armed_live"),
+        "kill_switch": db.state.get_bool("kill_switch"),
         "risk": {
             "max_drawdown": settings.max_drawdown_from_peak,
             "max_daily_loss": settings.max_daily_loss,
@@ -145,10 +287,11 @@ def settings_view(request: Request) -> HTMLResponse:
             "max_orders_per_hour": settings.max_orders_per_hour,
         },
     }
-    return templates.TemplateResponse("settings.html", context)
+    return templates.TemplateResponse(request, "settings.html", context)
 
 
 @app.post("/actions/run_once")
-def run_once_action() -> RedirectResponse:
-    runner.run_once()
+async def run_once_action() -> RedirectResponse:
+    await runner.run_once_async()
+    runner.states.invalidate()
     return RedirectResponse(url="/runs", status_code=303)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from types import MappingProxyType
+
+import httpx
+
+from app.broker import AsyncBrokerAdapter, BrokerAdapter
+from app.config import settings
+from app.stream import MarketDataService
+
+
+@dataclass(frozen=True, slots=True)
+class MarketSnapshot:
+    prices: Mapping[str, float]
+    fetched_at: float
+    stale: bool = False
+
+    @classmethod
+    def build(cls, prices: Mapping[str, float], fetched_at: float | None = None) -> MarketSnapshot:
+        return cls(
+            prices=MappingProxyType(dict(prices)),
+            fetched_at=time.time() if fetched_at is None else fetched_at,
+        )
+
+    @property
+    def as_of(self) -> str:
+        return datetime.fromtimestamp(self.fetched_at, UTC).isoformat()
+
+    def age(self, now: float | None = None) -> float:
+        return (time.time() if now is None else now) - self.fetched_at
+
+    def covers(self, symbols: Iterable[str]) -> bool:
+        return all(symbol in self.prices for symbol in symbols)
+
+    def price(self, symbol: str) -> float | None:
+        return self.prices.get(symbol)
+
+
+class MarketSnapshotCache:
+    def __init__(
+        self, ttl_seconds: float | None = None, stream: MarketDataService | None = None
+    ) -> None:
+        self.ttl_seconds = (
+            settings.market_snapshot_ttl_seconds if ttl_seconds is None else ttl_seconds
+        )
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._latest: MarketSnapshot | None = None
+
+    def latest(self) -> MarketSnapshot | None:
+        snapshot = self._latest
+        if snapshot is None or snapshot.age() > self.ttl_seconds:
+            return None
+        return snapshot
+
+    def _from_stream(self, symbols: list[str]) -> MarketSnapshot | None:
+        if self.stream is None:
+            return None
+        prices, oldest = self.stream.latest_prices(symbols)
+        if len(prices) < len(symbols):
+            return None
+        return self._store(prices, oldest)
+
+    def refresh(self, broker: BrokerAdapter, symbols: list[str]) -> MarketSnapshot:
+        streamed = self._from_stream(symbols)
+        if streamed is not None:
+            return streamed
+        try:
+            prices = broker.get_latest_prices(symbols)
+        except httpx.HTTPError as exc:
+            return self._stale_fallback(symbols, exc)
+        return self._store(prices)
+
+    async def refresh_async(self, broker: AsyncBrokerAdapter, symbols: list[str]) -> MarketSnapshot:
+        streamed = self._from_stream(symbols)
+        if streamed is not None:
+            return streamed
+        try:
+            prices = await broker.get_latest_prices(symbols)
+        except httpx.HTTPError as exc:
+            return self._stale_fallback(symbols, exc)
+        return self._store(prices)
+
+    def _store(
+        self, prices: Mapping[str, float], fetched_at: float | None = None
+    ) -> MarketSnapshot:
+        snapshot = MarketSnapshot.build(prices, fetched_at)
+        with self._lock:
+            self._latest = snapshot
+        return snapshot
+
+    def _stale_fallback(self, symbols: list[str], error: httpx.HTTPError) -> MarketSnapshot:
+        previous = self._latest
+        if previous is None or not previous.covers(symbols):
+            raise error
+        return replace(previous, stale=True)
+
+    def get(self, broker: BrokerAdapter, symbols: list[str]) -> MarketSnapshot:
+        snapshot = self.latest()
+        if snapshot is not None and snapshot.covers(symbols):
+            return snapshot
+        return self.refresh(broker, symbols)
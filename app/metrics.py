@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = super().render()
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_format(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return 0 if series is None else sum(series[0])
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted(
+                (key, list(counts), total[0]) for key, (counts, total) in self._series.items()
+            )
+        lines = super().render()
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format(bound)
+                labels = _labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+CYCLE_PHASE_SECONDS = registry.histogram(
+    "kudan_cycle_phase_seconds", "Time spent in each phase of a strategy cycle.", ("phase",)
+)
+CYCLES_TOTAL = registry.counter("kudan_cycles_total", "Strategy cycles by status.", ("status",))
+BROKER_REQUEST_SECONDS = registry.histogram(
+    "kudan_broker_request_seconds",
+    "Broker REST request latency.",
+    ("method", "endpoint", "status"),
+)
+SCHEDULER_OVERRUNS_TOTAL = registry.counter(
+    "kudan_scheduler_overruns_total", "Scheduler ticks that crossed more than one boundary."
+)
+
+
+class PhaseTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+            CYCLE_PHASE_SECONDS.observe(elapsed, phase=phase)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_millis(self) -> dict[str, float]:
+        timings = {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()}
+        timings["total"] = round(self.total() * 1000, 3)
+        return timings
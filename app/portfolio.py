@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import settings
+from app.strategies import Strategy
+
+
+@dataclass(slots=True)
+class NetTarget:
+    symbol: str
+    weight: float = 0.0
+    attribution: dict[str, float] = field(default_factory=dict)
+    live: bool = False
+
+
+@dataclass(slots=True)
+class OrderIntent:
+    symbol: str
+    side: str
+    qty: float
+    price: float
+    target: NetTarget
+
+    @property
+    def notional(self) -> float:
+        return self.qty * self.price
+
+
+def strategy_label(row: dict[str, Any]) -> str:
+    return f"{row['name']}:{row['id']}"
+
+
+def net_targets(
+    strategies: list[tuple[dict[str, Any], Strategy]],
+    targets: list[dict[str, float]],
+) -> dict[str, NetTarget]:
+    netted: dict[str, NetTarget] = {}
+    for (row, strategy), strategy_targets in zip(strategies, targets, strict=True):
+        label = strategy_label(row)
+        for symbol, weight in strategy_targets.items():
+            contribution = strategy.allocation * weight
+            target = netted.setdefault(symbol, NetTarget(symbol))
+            target.weight += contribution
+            target.attribution[label] = target.attribution.get(label, 0.0) + contribution
+            target.live = target.live or row["mode"] == "live"
+    return netted
+
+
+def order_intents(
+    netted: dict[str, NetTarget],
+    prices: dict[str, float],
+    equity: float,
+    pos_map: dict[str, float],
+    min_notional: float | None = None,
+    band: float | None = None,
+) -> list[OrderIntent]:
+    min_notional = settings.min_order_notional if min_notional is None else min_notional
+    band = settings.rebalance_band if band is None else band
+    intents: list[OrderIntent] = []
+    for symbol, target in netted.items():
+        price = prices.get(symbol)
+        if not price:
+            continue
+        delta = equity * target.weight / price - pos_map.get(symbol, 0.0)
+        notional = abs(delta) * price
+        if notional < max(min_notional, 1e-6):
+            continue
+        if equity > 0 and notional / equity < band:
+            continue
+        side = "buy" if delta > 0 else "sell"
+        intents.append(OrderIntent(symbol, side, abs(delta), price, target))
+    return intents
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime, timedelta
+
+from app import db
+
+
+class SlidingWindowCounter:
+    def __init__(self, window_seconds: float, clock: Callable[[], float] = time.time) -> None:
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._events: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._events and self._events[0] < cutoff:
+            self._events.popleft()
+
+    def record(self, at: float | None = None) -> None:
+        with self._lock:
+            self._events.append(self.clock() if at is None else at)
+
+    def count(self) -> int:
+        with self._lock:
+            self._evict(self.clock())
+            return len(self._events)
+
+    def reset(self, timestamps: Iterable[float]) -> None:
+        with self._lock:
+            self._events = deque(sorted(timestamps))
+            self._evict(self.clock())
+
+
+class OrderRateLimiter(SlidingWindowCounter):
+    def __init__(self, window_seconds: float = 3600.0) -> None:
+        super().__init__(window_seconds)
+
+    def rebuild(self) -> None:
+        since = datetime.now(UTC) - timedelta(seconds=self.window_seconds)
+        self.reset(
+            datetime.fromisoformat(created_at).timestamp()
+            for created_at in db.submitted_order_times_since(since.isoformat())
+        )
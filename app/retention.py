@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from app import db
+from app.config import settings
+
+ARCHIVE_TABLES = ("runs", "orders", "risk_events", "position_snapshots")
+GRANULARITIES = {"hour": 13, "day": 10}
+ROLLUPS: dict[str, tuple[str, str, str, str]] = {
+    "runs": (
+        "run_rollups",
+        "status",
+        "status, COUNT(*)",
+        "runs = runs + excluded.runs",
+    ),
+    "orders": (
+        "order_rollups",
+        "symbol, status, reason",
+        "symbol, status, COALESCE(reason, ''), COUNT(*), SUM(qty), SUM(COALESCE(notional, 0))",
+        "orders = orders + excluded.orders, qty = qty + excluded.qty, "
+        "notional = notional + excluded.notional",
+    ),
+    "risk_events": (
+        "risk_rollups",
+        "level, reason",
+        "level, reason, COUNT(*)",
+        "events = events + excluded.events",
+    ),
+}
+
+
+def retention_cutoff(now: datetime | None = None, raw_days: float | None = None) -> str:
+    now = now or datetime.now(UTC)
+    days = settings.retention_raw_days if raw_days is None else raw_days
+    cutoff = (now - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+    return cutoff.isoformat()
+
+
+def _rollup(conn: sqlite3.Connection, table: str, bounds: tuple[int, int], cutoff: str) -> None:
+    if table not in ROLLUPS:
+        return
+    rollup, keys, columns, update = ROLLUPS[table]
+    for granularity, width in GRANULARITIES.items():
+        conn.execute(
+            f"""
+            INSERT INTO {rollup}
+            SELECT ?, substr(created_at, 1, {width}), {columns}
+            FROM {table}
+            WHERE id BETWEEN ? AND ? AND created_at < ?
+            GROUP BY 2, {keys}
+            ON CONFLICT DO UPDATE SET {update}
+            """,
+            (granularity, *bounds, cutoff),
+        )
+
+
+def _write_segment(
+    conn: sqlite3.Connection, table: str, bounds: tuple[int, int], cutoff: str, path: Path
+) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    blobs = db.HISTORY_TABLES[table].blobs if table in db.HISTORY_TABLES else ()
+    cursor = conn.execute(
+        f"SELECT * FROM {table} WHERE id BETWEEN ? AND ? AND created_at < ? ORDER BY id",
+        (*bounds, cutoff),
+    )
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+            while rows := cursor.fetchmany(1000):
+                fh.write("".join(db.ndjson_line(blobs, row) for row in rows).encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+
+
+def archive_table(
+    table: str, cutoff: str, archive_dir: Path | None = None
+) -> dict[str, Any] | None:
+    archive_dir = archive_dir or Path(settings.archive_path)
+    with db.get_conn() as conn:
+        first_id, last_id, rows, start_at, end_at = conn.execute(
+            f"SELECT MIN(id), MAX(id), COUNT(*), MIN(created_at), MAX(created_at) "
+            f"FROM {table} WHERE created_at < ?",
+            (cutoff,),
+        ).fetchone()
+        if not rows:
+            return None
+        bounds = (first_id, last_id)
+        path = archive_dir / table / f"{first_id:012d}-{last_id:012d}.ndjson.gz"
+        _write_segment(conn, table, bounds, cutoff, path)
+        _rollup(conn, table, bounds, cutoff)
+        conn.execute(
+            """
+            INSERT INTO archive_segments(
+                table_name, path, first_id, last_id, start_at, end_at, rows, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (table, str(path), first_id, last_id, start_at, end_at, rows, db.utcnow_iso()),
+        )
+        conn.execute(
+            f"DELETE FROM {table} WHERE id BETWEEN ? AND ? AND created_at < ?",
+            (*bounds, cutoff),
+        )
+    return {"rows": rows, "path": str(path), "start_at": start_at, "end_at": end_at}
+
+
+def enable_incremental_vacuum() -> bool:
+    with db.get_conn() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.commit()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+
+
+def incremental_vacuum() -> int:
+    with db.get_conn() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+        return int(free)
+
+
+def run_retention(
+    now: datetime | None = None,
+    raw_days: float | None = None,
+    archive_dir: Path | None = None,
+) -> dict[str, Any]:
+    cutoff = retention_cutoff(now, raw_days)
+    archived = {table: archive_table(table, cutoff, archive_dir) for table in ARCHIVE_TABLES}
+    return {"cutoff": cutoff, "archived": archived, "freed_pages": incremental_vacuum()}
+
+
+def iter_archive(
+    table: str, since: str | None = None, until: str | None = None
+) -> Iterator[dict[str, Any]]:
+    clauses, params = ["table_name = ?"], [table]
+    if since is not None:
+        clauses.append("end_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("start_at < ?")
+        params.append(until)
+    sql = f"SELECT path FROM archive_segments WHERE {' AND '.join(clauses)} ORDER BY first_id"
+    with db.get_conn() as conn:
+        paths = [row[0] for row in conn.execute(sql, params)]
+    for path in paths:
+        with gzip.open(path, "rt") as fh:
+            for line in fh:
+                item = json.loads(line)
+                created_at = item["created_at"]
+                if (since is None or created_at >= since) and (until is None or created_at < until):
+                    yield item
+
+
+def list_rollups(
+    table: str, granularity: str = "hour", since: str | None = None, until: str | None = None
+) -> list[dict[str, Any]]:
+    if table not in ROLLUPS or granularity not in GRANULARITIES:
+        raise ValueError(f"No {granularity} rollup for {table}")
+    width = GRANULARITIES[granularity]
+    clauses, params = ["granularity = ?"], [granularity]
+    if since is not None:
+        clauses.append(f"bucket >= substr(?, 1, {width})")
+        params.append(since)
+    if until is not None:
+        clauses.append(f"bucket < substr(?, 1, {width})")
+        params.append(until)
+    with db.get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM {ROLLUPS[table][0]} WHERE {' AND '.join(clauses)} ORDER BY bucket",
+            params,
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Roll up and archive old audit rows")
+    parser.add_argument("--raw-days", type=float, default=None)
+    parser.add_argument("--archive-dir", type=Path, default=None)
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Rewrite a database created without auto_vacuum (full VACUUM; stop trading first)",
+    )
+    args = parser.parse_args()
+    db.init_db()
+    if args.enable_incremental_vacuum:
+        print(json.dumps({"converted": enable_incremental_vacuum()}))
+        return
+    print(json.dumps(run_retention(raw_days=args.raw_days, archive_dir=args.archive_dir)))
+
+
+if __name__ == "__main__":
+    main()
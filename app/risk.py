@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
 from app import db
+from app.audit import AuditRecorder
 from app.config import settings
 
+if TYPE_CHECKING:
+    from app.broker import Account
+    from app.portfolio import OrderIntent
+
 
 @dataclass(slots=True)
 class RiskDecision:
@@ -22,32 +29,38 @@ class RiskGovernor:
         self.max_gross_exposure = settings.max_gross_exposure
         self.max_orders_per_hour = settings.max_orders_per_hour
 
-    def evaluate(
-        self,
-        equity: float,
-        gross_exposure: float,
-        order_notional: float,
-        orders_last_hour: int,
-    ) -> RiskDecision:
+    def _account_checks(self, equity: float) -> tuple[list[str], bool]:
         reasons: list[str] = []
-        pause = False
-        kill = db.get_state("kill_switch", "false") == "true"
+        kill = db.state.get_bool("kill_switch")
 
-        peak = float(db.get_state("peak_equity", "100000"))
-        day_start = float(db.get_state("day_start_equity", str(equity)))
+        peak = db.state.get_float("peak_equity", 100000.0)
+        day_start = db.state.get_float("day_start_equity", equity)
         drawdown = 0.0 if peak <= 0 else max(0.0, (peak - equity) / peak)
         daily_loss = 0.0 if day_start <= 0 else max(0.0, (day_start - equity) / day_start)
 
         if equity > peak:
-            db.set_state("peak_equity", str(equity))
+            db.state.set_float("peak_equity", equity)
 
         if drawdown >= self.max_drawdown:
             reasons.append("max_drawdown_exceeded")
-            pause = True
 
         if daily_loss >= self.max_daily_loss:
             reasons.append("max_daily_loss_exceeded")
-            pause = True
+
+        if reasons:
+            db.state.set_bool("paused", True)
+        return reasons, kill
+
+    def evaluate(
+        self,
+        equity: float,
+        gross_exposure: float,
+        order_notional: float,
+        orders_last_hour: int,
+        audit: AuditRecorder | None = None,
+    ) -> RiskDecision:
+        reasons, kill = self._account_checks(equity)
+        pause = bool(reasons)
 
         if gross_exposure > self.max_gross_exposure:
             reasons.append("max_gross_exposure_exceeded")
@@ -61,27 +74,96 @@ class RiskGovernor:
         if kill:
             reasons.append("kill_switch_enabled")
 
-        if pause:
-            db.set_state("paused", "true")
-
         allowed = len(reasons) == 0
         if not allowed:
-            for reason in reasons:
-                db.insert_risk_event(
-                    level="block",
-                    reason=reason,
-                    context={
-                        "equity": equity,
-                        "gross_exposure": gross_exposure,
-                        "order_notional": order_notional,
-                        "orders_last_hour": orders_last_hour,
-                    },
-                )
+            context = {
+                "equity": equity,
+                "gross_exposure": gross_exposure,
+                "order_notional": order_notional,
+                "orders_last_hour": orders_last_hour,
+            }
+            record_blocks({reason: context for reason in reasons}, audit)
         return RiskDecision(allowed=allowed, reasons=reasons, pause=pause, kill_switch=kill)
 
+    def evaluate_orders(
+        self,
+        account: Account,
+        positions: list[dict[str, Any]],
+        orders: Sequence[OrderIntent],
+        orders_last_hour: int = 0,
+        audit: AuditRecorder | None = None,
+    ) -> list[RiskDecision]:
+        equity = account.equity
+        account_reasons, kill = self._account_checks(equity)
+        pause = bool(account_reasons)
+        values = {p["symbol"]: float(p["market_value"]) for p in positions}
+        exposure = sum(abs(value) for value in values.values())
+        context: dict[str, Any] = {
+            "equity": equity,
+            "gross_exposure": exposure / equity if equity > 0 else None,
+            "orders_last_hour": orders_last_hour,
+        }
+        blocked: dict[str, list[dict[str, Any]]] = {}
+
+        decisions: list[RiskDecision | None] = [None] * len(orders)
+        for index in sorted(range(len(orders)), key=lambda i: exposure_change(orders[i], values)):
+            order = orders[index]
+            current = values.get(order.symbol, 0.0)
+            value = current + (order.notional if order.side == "buy" else -order.notional)
+            projected = exposure - abs(current) + abs(value)
+            reasons = list(account_reasons)
+
+            if projected > exposure and projected > equity * self.max_gross_exposure:
+                reasons.append("max_gross_exposure_exceeded")
+
+            if order.notional > equity * self.per_trade_risk:
+                reasons.append("per_trade_risk_exceeded")
+
+            if orders_last_hour >= self.max_orders_per_hour:
+                reasons.append("max_orders_per_hour_exceeded")
+
+            if kill:
+                reasons.append("kill_switch_enabled")
+
+            if reasons:
+                item = {
+                    "symbol": order.symbol,
+                    "side": order.side,
+                    "order_notional": order.notional,
+                    "projected_exposure": projected / equity if equity > 0 else None,
+                }
+                for reason in reasons:
+                    blocked.setdefault(reason, []).append(item)
+            else:
+                values[order.symbol] = value
+                exposure = projected
+                orders_last_hour += 1
+            decisions[index] = RiskDecision(
+                allowed=not reasons, reasons=reasons, pause=pause, kill_switch=kill
+            )
+
+        record_blocks(
+            {reason: {**context, "orders": items} for reason, items in blocked.items()}, audit
+        )
+        return [decision for decision in decisions if decision is not None]
+
+
+def exposure_change(order: OrderIntent, values: dict[str, float]) -> float:
+    current = values.get(order.symbol, 0.0)
+    signed = order.notional if order.side == "buy" else -order.notional
+    return abs(current + signed) - abs(current)
+
+
+def record_blocks(blocks: dict[str, dict[str, Any]], audit: AuditRecorder | None = None) -> None:
+    if audit is None:
+        db.insert_risk_events([("block", reason, context) for reason, context in blocks.items()])
+        return
+    for reason, context in blocks.items():
+        audit.add_risk_event(level="block", reason=reason, context=context)
+
 
 def is_live_allowed() -> bool:
-    return settings.live_trading_env and db.get_state("armed_live", "false") == "true"
+    return settings.live_trading_env and db.state.get_bool("armed_live")
 
 
 def ensure_live_gate() -> RiskDecision:
@@ -90,6 +172,6 @@ def ensure_live_gate() -> RiskDecision:
     reasons = []
     if not settings.live_trading_env:
         reasons.append("LIVE_TRADING env var disabled")
-    if db.get_state("armed_live", "false") != "true":
+    if not db.state.get_bool("armed_live"):
         reasons.append("System is not armed in UI")
     return RiskDecision(allowed=False, reasons=reasons)
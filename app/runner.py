@@ -1,122 +1,493 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
+import math
 import threading
 import time
+from collections import deque
+from collections.abc import Callable, Iterable
 from typing import Any
 
 from app import db
-from app.broker import BrokerAdapter, build_broker
+from app.audit import AuditRecorder, BackgroundWriter
+from app.bars import BarStore, BarWindow, timeframe_seconds
+from app.broker import (
+    Account,
+    AsyncBrokerAdapter,
+    BrokerAdapter,
+    build_async_broker,
+    build_broker,
+)
 from app.config import settings
+from app.events import bus
+from app.execution import OrderExecutor
+from app.market import MarketSnapshot, MarketSnapshotCache
+from app.metrics import (
+    CYCLE_PHASE_SECONDS,
+    CYCLES_TOTAL,
+    SCHEDULER_OVERRUNS_TOTAL,
+    PhaseTimer,
+)
+from app.portfolio import OrderIntent, net_targets, order_intents
+from app.ratelimit import OrderRateLimiter
+from app.retention import run_retention
 from app.risk import RiskGovernor, ensure_live_gate
-from app.strategies import build_strategy
+from app.state import StateSnapshot, StateSnapshotCache, build_state
+from app.strategies import Strategy, StrategyCache
+from app.stream import MarketDataService, build_market_stream
+
+logger = logging.getLogger(__name__)
 
 
 class StrategyRunner:
-    def __init__(self, broker: BrokerAdapter | None = None) -> None:
+    def __init__(
+        self,
+        broker: BrokerAdapter | None = None,
+        async_broker: AsyncBrokerAdapter | None = None,
+    ) -> None:
         self.broker = broker or build_broker()
+        self.async_broker = async_broker or build_async_broker(self.broker)
         self.risk = RiskGovernor()
+        self.market = MarketSnapshotCache()
+        self.snapshots = BackgroundWriter(db.insert_position_snapshots)
+        self.order_rate = OrderRateLimiter()
+        self.bars = BarStore()
+        self.executor = OrderExecutor(self.broker, self.async_broker)
+        self.stream: MarketDataService | None = None
+        self.strategies = StrategyCache()
+        self._feed_lock = threading.Lock()
+        self.states = StateSnapshotCache()
+
+    def start_stream(self) -> None:
+        if self.stream is not None:
+            return
+        self.stream = build_market_stream(universe_of(self.enabled_strategies()), self.bars)
+        if self.stream is not None:
+            self.market.stream = self.stream
+            self.stream.start()
+
+    def close(self) -> None:
+        if self.stream is not None:
+            self.stream.stop()
+        self.executor.close()
+        self.snapshots.close()
+        self.broker.close()
 
-    def run_once(self) -> dict[str, Any]:
+    def enabled_strategies(self) -> list[tuple[dict[str, Any], Strategy]]:
+        return self.strategies.enabled()
+
+    def market_snapshot(self) -> MarketSnapshot:
+        return self.market.get(self.broker, universe_of(self.enabled_strategies()))
+
+    def fetch_state(self) -> dict[str, Any]:
         account = self.broker.get_account()
         positions = self.broker.get_positions()
-        pos_map = {p["symbol"]: float(p["qty"]) for p in positions}
-        exposure = sum(abs(float(p["market_value"])) for p in positions)
-        gross_exposure = 0.0 if account.equity <= 0 else exposure / account.equity
+        return build_state(account, positions, self.market_snapshot())
 
-        decisions: list[dict[str, Any]] = []
-        for strategy_row in db.list_strategies():
-            if not strategy_row["enabled"]:
-                continue
-            strategy = build_strategy(strategy_row["name"], json.loads(strategy_row["config"]))
-            market_data = {}
+    def publish_state(self) -> StateSnapshot:
+        return self.states.publish(self.fetch_state())
+
+    def state_snapshot(self) -> StateSnapshot:
+        return self.states.get(self.fetch_state)
+
+    def run_once(self, timeframes: set[str] | None = None) -> dict[str, Any]:
+        timer = PhaseTimer()
+        with timer.span("load_strategies"):
+            strategies = self.enabled_strategies()
+        with timer.span("quotes"):
+            snapshot = self.market.refresh(self.broker, universe_of(strategies))
+        with timer.span("account"):
+            account = self.broker.get_account()
+        with timer.span("positions"):
+            positions = self.broker.get_positions()
+        with timer.span("strategies"):
+            for _, strategy in self._due(strategies, timeframes):
+                strategy.last_targets = self._targets(strategy, snapshot)
+        targets = [strategy.last_targets or {} for _, strategy in strategies]
+        audit = AuditRecorder()
+        with timer.span("risk"):
+            decisions = self._plan(strategies, targets, snapshot, account, positions, audit)
+        approved = [d for d in decisions if d["status"] == "approved"]
+        with timer.span("orders"):
+            if approved:
+                self.executor.submit(audit.begin(), approved)
+        return self._record(decisions, snapshot, positions, audit, timer)
+
+    async def run_once_async(self, timeframes: set[str] | None = None) -> dict[str, Any]:
+        timer = PhaseTimer()
+        with timer.span("load_strategies"):
+            strategies = await asyncio.to_thread(self.enabled_strategies)
+        with timer.span("fetch"):
+            snapshot, account, positions = await asyncio.gather(
+                self.market.refresh_async(self.async_broker, universe_of(strategies)),
+                self.async_broker.get_account(),
+                self.async_broker.get_positions(),
+            )
+        due = self._due(strategies, timeframes)
+        with timer.span("strategies"):
+            computed = await asyncio.gather(
+                *(asyncio.to_thread(self._targets, strategy, snapshot) for _, strategy in due)
+            )
+        for (_, strategy), strategy_targets in zip(due, computed, strict=True):
+            strategy.last_targets = strategy_targets
+        targets = [strategy.last_targets or {} for _, strategy in strategies]
+        audit = AuditRecorder()
+        with timer.span("risk"):
+            decisions = await asyncio.to_thread(
+                self._plan, strategies, targets, snapshot, account, positions, audit
+            )
+        approved = [d for d in decisions if d["status"] == "approved"]
+        with timer.span("orders"):
+            if approved:
+                await self.executor.submit_async(await asyncio.to_thread(audit.begin), approved)
+        return await asyncio.to_thread(self._record, decisions, snapshot, positions, audit, timer)
+
+    def _targets(self, strategy: Strategy, snapshot: MarketSnapshot) -> dict[str, float]:
+        targets: dict[str, float] = {}
+        cold: list[str] = []
+        with self._feed_lock:
             for symbol in strategy.universe:
-                latest = self.broker.get_latest_price(symbol)
-                market_data[symbol] = [latest * 0.99, latest]
-            targets = strategy.generate_targets(market_data)
-            mode = strategy_row["mode"]
-            for symbol, target_weight in targets.items():
-                price = self.broker.get_latest_price(symbol)
-                target_qty = (account.equity * target_weight) / price
-                current_qty = pos_map.get(symbol, 0.0)
-                delta = target_qty - current_qty
-                if abs(delta) < 1e-6:
+                if snapshot.price(symbol) is None:
                     continue
-                side = "buy" if delta > 0 else "sell"
-                qty = abs(delta)
-                order_notional = qty * price
-
-                if mode == "live":
-                    gate = ensure_live_gate()
-                    if not gate.allowed:
-                        decisions.append(
-                            {"symbol": symbol, "status": "blocked", "reasons": gate.reasons}
-                        )
-                        continue
-
-                decision = self.risk.evaluate(
-                    equity=account.equity,
-                    gross_exposure=gross_exposure,
-                    order_notional=order_notional,
-                    orders_last_hour=db.orders_in_last_hour(),
+                bars = completed_bars(strategy, symbol, self.bars, self.stream)
+                weight = strategy.advance(symbol, bars)
+                if weight is None:
+                    cold.append(symbol)
+                else:
+                    targets[symbol] = weight
+        if cold:
+            targets.update(
+                strategy.generate_targets(
+                    market_data_for(strategy, snapshot, self.bars, self.stream, cold)
                 )
-                if not decision.allowed:
-                    decisions.append(
-                        {"symbol": symbol, "status": "risk_block", "reasons": decision.reasons}
-                    )
+            )
+        return targets
+
+    def _due(
+        self, strategies: list[tuple[dict[str, Any], Strategy]], timeframes: set[str] | None
+    ) -> list[tuple[dict[str, Any], Strategy]]:
+        return [
+            (row, strategy)
+            for row, strategy in strategies
+            if timeframes is None
+            or strategy.timeframe in timeframes
+            or strategy.last_targets is None
+        ]
+
+    def _plan(
+        self,
+        strategies: list[tuple[dict[str, Any], Strategy]],
+        targets: list[dict[str, float]],
+        snapshot: MarketSnapshot,
+        account: Account,
+        positions: list[dict[str, Any]],
+        audit: AuditRecorder,
+    ) -> list[dict[str, Any]]:
+        pos_map = {p["symbol"]: float(p["qty"]) for p in positions}
+        netted = net_targets(strategies, targets)
+        intents = order_intents(netted, dict(snapshot.prices), account.equity, pos_map)
+
+        decisions: list[dict[str, Any]] = []
+        for symbol, target in netted.items():
+            if snapshot.price(symbol) or (target.weight == 0 and not pos_map.get(symbol)):
+                continue
+            decisions.append(
+                {
+                    "symbol": symbol,
+                    "side": "buy" if target.weight > 0 else "sell",
+                    "qty": 0.0,
+                    "price": 0.0,
+                    "target_weight": target.weight,
+                    "strategies": target.attribution,
+                    "status": "blocked",
+                    "reasons": ["missing_price"],
+                }
+            )
+        candidates: list[tuple[dict[str, Any], OrderIntent]] = []
+        for intent in intents:
+            decision = {
+                "symbol": intent.symbol,
+                "side": intent.side,
+                "qty": intent.qty,
+                "price": intent.price,
+                "target_weight": intent.target.weight,
+                "strategies": intent.target.attribution,
+            }
+            decisions.append(decision)
+            if snapshot.stale:
+                decision.update(status="blocked", reasons=["stale_market_data"])
+                continue
+
+            if intent.target.live:
+                gate = ensure_live_gate()
+                if not gate.allowed:
+                    decision.update(status="blocked", reasons=gate.reasons)
                     continue
 
-                order = self.broker.place_order(
-                    symbol=symbol,
-                    side=side,
-                    qty=qty,
-                    order_type="market",
-                )
-                decisions.append({"symbol": symbol, "status": "submitted", "order_id": order["id"]})
+            candidates.append((decision, intent))
+
+        if candidates:
+            results = self.risk.evaluate_orders(
+                account,
+                positions,
+                [intent for _, intent in candidates],
+                orders_last_hour=self.order_rate.count(),
+                audit=audit,
+            )
+            for (decision, _), result in zip(candidates, results, strict=True):
+                if result.allowed:
+                    decision["status"] = "approved"
+                else:
+                    decision.update(status="risk_block", reasons=result.reasons)
+        return decisions
 
+    def _record(
+        self,
+        decisions: list[dict[str, Any]],
+        snapshot: MarketSnapshot,
+        positions: list[dict[str, Any]],
+        audit: AuditRecorder,
+        timer: PhaseTimer,
+    ) -> dict[str, Any]:
         status = (
             "ok"
             if all(d["status"] == "submitted" for d in decisions) or not decisions
             else "partial"
         )
-        run_id = db.insert_run(
+        audit.set_run(
             status=status,
             summary=f"Cycle executed with {len(decisions)} decisions",
-            details={"decisions": decisions},
+            details={
+                "decisions": decisions,
+                "market": {"as_of": snapshot.as_of, "stale": snapshot.stale},
+                "timings_ms": timer.as_millis(),
+            },
         )
         for d in decisions:
             if d["status"] == "submitted":
-                db.insert_order(run_id, d["symbol"], "buy", 1.0, "submitted", d.get("order_id"))
-            else:
-                db.insert_order(
-                    run_id,
-                    d["symbol"],
-                    "buy",
-                    0.0,
-                    d["status"],
-                    None,
-                    ",".join(d.get("reasons", [])),
-                )
+                self.order_rate.record()
+            audit.add_order(
+                d["symbol"],
+                d["side"],
+                d["qty"],
+                d["status"],
+                d.get("order_id"),
+                ",".join(d.get("reasons", [])) or None,
+                d.get("client_order_id"),
+                d.get("broker_status"),
+                d["qty"] * d["price"],
+            )
+        run = audit.run
+        risk_events = list(audit.risk_events)
+        with timer.span("record"):
+            run_id = audit.flush()
+        self._publish_events(run_id, run, decisions, risk_events)
+        now = db.utcnow_iso()
+        self.snapshots.submit(
+            [(now, p["symbol"], float(p["qty"]), float(p["market_value"])) for p in positions]
+        )
+        CYCLES_TOTAL.inc(status=status)
+        CYCLE_PHASE_SECONDS.observe(timer.total(), phase="total")
         return {"run_id": run_id, "status": status, "decisions": decisions}
 
+    def _publish_events(
+        self,
+        run_id: int | None,
+        run: tuple[str, str, str, dict[str, Any]] | None,
+        decisions: list[dict[str, Any]],
+        risk_events: list[tuple[str, str, str, dict[str, Any]]],
+    ) -> None:
+        for created_at, level, reason, context in risk_events:
+            bus.publish(
+                "risk",
+                {"created_at": created_at, "level": level, "reason": reason, "context": context},
+            )
+        for d in decisions:
+            bus.publish(
+                "order",
+                {
+                    "run_id": run_id,
+                    "symbol": d["symbol"],
+                    "side": d["side"],
+                    "qty": d["qty"],
+                    "status": d["status"],
+                    "broker_status": d.get("broker_status"),
+                    "client_order_id": d.get("client_order_id"),
+                },
+            )
+        if run is not None:
+            created_at, status, summary, details = run
+            bus.publish(
+                "run",
+                {
+                    "id": run_id,
+                    "created_at": created_at,
+                    "status": status,
+                    "summary": summary,
+                    "timings_ms": details.get("timings_ms", {}),
+                    "details": details,
+                },
+            )
+
+
+def universe_of(strategies: list[tuple[dict[str, Any], Strategy]]) -> list[str]:
+    return list(dict.fromkeys(s for _, strategy in strategies for s in strategy.universe))
+
+
+def completed_bars(
+    strategy: Strategy,
+    symbol: str,
+    bars: BarStore,
+    stream: MarketDataService | None = None,
+) -> BarWindow:
+    since = strategy.last_bar_ts(symbol)
+    if stream is not None and strategy.timeframe == "1m":
+        recent = stream.bars_since(symbol, since, strategy.lookback)
+        if len(recent):
+            return recent
+    if since is None:
+        return bars.tail(symbol, strategy.timeframe, strategy.lookback)
+    return bars.window(symbol, strategy.timeframe, start=since + 1)
+
+
+def market_data_for(
+    strategy: Strategy,
+    snapshot: MarketSnapshot,
+    bars: BarStore,
+    stream: MarketDataService | None = None,
+    symbols: Iterable[str] | None = None,
+) -> dict[str, list[float]]:
+    market_data: dict[str, list[float]] = {}
+    needed = strategy.lookback - 1
+    for symbol in strategy.universe if symbols is None else symbols:
+        price = snapshot.price(symbol)
+        if price is None:
+            continue
+        history = stream.closes(symbol, needed) if stream is not None else None
+        if history is None or strategy.timeframe != "1m" or len(history) < needed:
+            history = bars.tail(symbol, strategy.timeframe, needed).close
+        market_data[symbol] = [*history.tolist(), price] if len(history) else [price * 0.99, price]
+    return market_data
+
+
+def timeframe_periods(strategies: list[tuple[dict[str, Any], Strategy]]) -> dict[str, int]:
+    return {strategy.timeframe: timeframe_seconds(strategy.timeframe) for _, strategy in strategies}
+
+
+def next_boundary(after: float, periods: Iterable[int]) -> float:
+    return min((math.floor(after / period) + 1) * period for period in periods)
+
+
+def crossed_boundaries(since: float, until: float, period: int) -> int:
+    return math.floor(until / period) - math.floor(since / period)
+
 
 class Scheduler:
-    def __init__(self, runner: StrategyRunner) -> None:
+    def __init__(
+        self,
+        runner: StrategyRunner,
+        clock: Callable[[], float] = time.time,
+        history: int = 100,
+    ) -> None:
         self.runner = runner
+        self.clock = clock
+        self.overruns: deque[dict[str, Any]] = deque(maxlen=history)
+        self.errors = 0
+        self.last_duration = 0.0
+        self._periods: dict[str, int] = {}
+        self._next_retention: float | None = None
+        self._retention: threading.Thread | None = None
         self._thread: threading.Thread | None = None
         self._stop = threading.Event()
 
     def start(self) -> None:
         if not settings.scheduler_enabled or self._thread:
             return
-
-        def loop() -> None:
-            while not self._stop.is_set():
-                self.runner.run_once()
-                time.sleep(settings.scheduler_interval_seconds)
-
-        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
-    def stop(self) -> None:
+    def stop(self, timeout: float | None = 5.0) -> None:
         self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def periods(self) -> dict[str, int]:
+        try:
+            self._periods = timeframe_periods(self.runner.enabled_strategies())
+        except Exception:
+            self.errors += 1
+            logger.exception("failed to load strategy timeframes")
+        return self._periods or {"default": settings.scheduler_interval_seconds}
+
+    def tick(self, last: float, now: float, periods: dict[str, int]) -> set[str]:
+        crossed = {tf: crossed_boundaries(last, now, period) for tf, period in periods.items()}
+        due = {tf for tf, count in crossed.items() if count}
+        skipped = {tf: count - 1 for tf, count in crossed.items() if count > 1}
+        if skipped:
+            SCHEDULER_OVERRUNS_TOTAL.inc()
+            self.overruns.append(
+                {
+                    "at": now,
+                    "previous_duration": self.last_duration,
+                    "coalesced": skipped,
+                }
+            )
+            logger.warning("scheduler overran by %.3fs, coalescing %s", self.last_duration, skipped)
+        if not due:
+            return due
+        started = self.clock()
+        try:
+            self.runner.run_once(due)
+        except Exception:
+            self.errors += 1
+            logger.exception("scheduled cycle failed")
+        finally:
+            self.last_duration = self.clock() - started
+        try:
+            self.runner.publish_state()
+        except Exception:
+            self.errors += 1
+            logger.exception("failed to publish state snapshot")
+        return due
+
+    def _loop(self) -> None:
+        last = self.clock()
+        while not self._stop.is_set():
+            periods = self.periods()
+            delay = next_boundary(last, periods.values()) - self.clock()
+            if delay > 0 and self._stop.wait(delay):
+                return
+            now = self.clock()
+            self.tick(last, now, periods)
+            self.maybe_run_retention(now)
+            last = now
+
+    def maybe_run_retention(self, now: float) -> None:
+        interval = settings.retention_interval_hours * 3600
+        if interval <= 0:
+            return
+        if self._next_retention is None:
+            self._next_retention = db.state.get_float("retention_next_at", 0.0)
+            if not self._next_retention:
+                self._schedule_retention(now + interval)
+        if now < self._next_retention:
+            return
+        if self._retention is not None and self._retention.is_alive():
+            return
+        self._schedule_retention(now + interval)
+        self._retention = threading.Thread(target=self._run_retention, daemon=True)
+        self._retention.start()
+
+    def _schedule_retention(self, at: float) -> None:
+        self._next_retention = at
+        db.state.set_float("retention_next_at", at)
+
+    def _run_retention(self) -> None:
+        try:
+            result = run_retention()
+        except Exception:
+            self.errors += 1
+            logger.exception("retention failed")
+            return
+        logger.info("retention archived %s", result["archived"])
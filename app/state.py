@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+
+from app import db
+from app.broker import Account
+from app.config import settings
+from app.events import bus
+from app.market import MarketSnapshot
+from app.risk import ensure_live_gate
+
+
+def build_state(
+    account: Account, positions: list[dict[str, Any]], market: MarketSnapshot
+) -> dict[str, Any]:
+    exposure = sum(abs(float(p["market_value"])) for p in positions)
+    peak = db.state.get_float("peak_equity", account.equity)
+    drawdown = 0.0 if peak <= 0 else max(0.0, (peak - account.equity) / peak)
+    day_start = db.state.get_float("day_start_equity", account.equity)
+    return {
+        "equity": account.equity,
+        "drawdown": drawdown,
+        "daily_pnl": account.equity - day_start,
+        "exposure": exposure,
+        "positions": positions,
+        "prices": dict(market.prices),
+        "prices_as_of": market.as_of,
+        "prices_stale": market.stale,
+        "mode": "live" if ensure_live_gate().allowed else "paper",
+        "kill_switch": db.state.get_bool("kill_switch"),
+        "armed": db.state.get_bool("armed_live"),
+    }
+
+
+@dataclass(frozen=True, slots=True)
+class StateSnapshot:
+    payload: dict[str, Any]
+    fetched_at: float
+    etag: str
+    stale: bool = False
+    expired: bool = False
+
+    @classmethod
+    def build(cls, payload: dict[str, Any], fetched_at: float | None = None) -> StateSnapshot:
+        digest = hashlib.sha1(
+            json.dumps(payload, sort_keys=True, default=str).encode(), usedforsecurity=False
+        ).hexdigest()
+        return cls(
+            payload=payload,
+            fetched_at=time.time() if fetched_at is None else fetched_at,
+            etag=f'W/"{digest[:20]}"',
+        )
+
+    @property
+    def as_of(self) -> str:
+        return datetime.fromtimestamp(self.fetched_at, UTC).isoformat()
+
+    def age(self, now: float | None = None) -> float:
+        return (time.time() if now is None else now) - self.fetched_at
+
+    def fresh(self, max_age_seconds: float) -> bool:
+        return not self.expired and self.age() <= max_age_seconds
+
+    def as_stale(self) -> StateSnapshot:
+        return replace(self, stale=True, etag=f'{self.etag[:-1]}-stale"')
+
+    def body(self) -> dict[str, Any]:
+        return {**self.payload, "as_of": self.as_of, "stale": self.stale}
+
+    def matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.etag.removeprefix("W/") in tags
+
+
+class StateSnapshotCache:
+    def __init__(self, max_age_seconds: float | None = None) -> None:
+        self.max_age_seconds = (
+            settings.state_snapshot_max_age_seconds if max_age_seconds is None else max_age_seconds
+        )
+        self._lock = threading.Lock()
+        self._latest: StateSnapshot | None = None
+        self._published_etag: str | None = None
+
+    def latest(self) -> StateSnapshot | None:
+        return self._latest
+
+    def publish(self, payload: dict[str, Any]) -> StateSnapshot:
+        snapshot = StateSnapshot.build(payload)
+        self._latest = snapshot
+        if snapshot.etag != self._published_etag:
+            self._published_etag = snapshot.etag
+            bus.publish("state", snapshot.body())
+        return snapshot
+
+    def invalidate(self) -> None:
+        snapshot = self._latest
+        if snapshot is not None:
+            self._latest = replace(snapshot, expired=True)
+
+    def get(self, fetch: Callable[[], dict[str, Any]]) -> StateSnapshot:
+        snapshot = self._latest
+        if snapshot is not None and snapshot.fresh(self.max_age_seconds):
+            return snapshot
+        with self._lock:
+            snapshot = self._latest
+            if snapshot is not None and snapshot.fresh(self.max_age_seconds):
+                return snapshot
+            try:
+                return self.publish(fetch())
+            except httpx.HTTPError:
+                if snapshot is None:
+                    raise
+                return snapshot.as_stale()
@@ -1,51 +1,259 @@
 from __future__ import annotations
 
+import hashlib
+import importlib
+import json
+import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Any
+from collections import deque
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import numpy as np
+
+from app import db
+from app.config import settings
+from app.indicators import SMA, Returns
+
+if TYPE_CHECKING:
+    from app.bars import Bar, BarWindow
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYMBOLS = ["BTCUSD", "ETHUSD"]
+STRATEGIES: dict[str, type[Strategy]] = {}
+
+S = TypeVar("S", bound="type[Strategy]")
+
+
+def register_strategy(name: str) -> Callable[[S], S]:
+    def register(cls: S) -> S:
+        if STRATEGIES.get(name, cls) is not cls:
+            raise ValueError(f"Strategy {name} is already registered")
+        cls.name = name
+        STRATEGIES[name] = cls
+        return cls
+
+    return register
+
+
+def load_strategy_plugins(modules: Iterable[str] | None = None) -> None:
+    for module in settings.strategy_plugins if modules is None else modules:
+        importlib.import_module(module)
 
 
 class Strategy(ABC):
     name: str
     universe: list[str]
     timeframe: str = "1m"
+    lookback: int = 2
+    allocation: float = 1.0
+    last_targets: dict[str, float] | None = None
+    _history: dict[str, deque[float]] | None = None
+    _fed: dict[str, tuple[int, float]] | None = None
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> Strategy:
+        return cls(config.get("symbols", DEFAULT_SYMBOLS), lookback=int(config.get("lookback", 2)))
 
     @abstractmethod
     def generate_targets(self, market_data: dict[str, list[float]]) -> dict[str, float]: ...
 
+    def on_bar(self, symbol: str, bar: Bar) -> float:
+        if self._history is None:
+            self._history = {}
+        closes = self._history.setdefault(symbol, deque(maxlen=self.lookback))
+        closes.append(bar.close)
+        return self.generate_targets({symbol: list(closes)}).get(symbol, 0.0)
 
-class MomentumStrategy(Strategy):
-    name = "momentum"
+    def reset(self) -> None:
+        self._history = None
+        self._fed = None
+
+    def last_bar_ts(self, symbol: str) -> int | None:
+        fed = self._fed.get(symbol) if self._fed is not None else None
+        return None if fed is None else fed[0]
 
-    def __init__(self, universe: list[str]) -> None:
+    def advance(self, symbol: str, bars: BarWindow) -> float | None:
+        if self._fed is None:
+            self._fed = {}
+        fed = self._fed.get(symbol)
+        start = 0 if fed is None else int(np.searchsorted(bars.ts, fed[0], "right"))
+        if start >= len(bars):
+            return None if fed is None else fed[1]
+        for index in range(start, len(bars)):
+            weight = self.on_bar(symbol, bars.bar(index))
+        self._fed[symbol] = (int(bars.ts[-1]), weight)
+        return weight
+
+    def target_weights(self, closes: np.ndarray) -> np.ndarray:
+        weights = np.zeros(closes.shape, dtype=np.float64)
+        for t in range(self.lookback - 1, closes.shape[0]):
+            window = closes[max(0, t - self.lookback + 1) : t + 1]
+            market_data = {symbol: window[:, j].tolist() for j, symbol in enumerate(self.universe)}
+            targets = self.generate_targets(market_data)
+            weights[t] = [targets.get(symbol, 0.0) for symbol in self.universe]
+        return weights
+
+
+@register_strategy("momentum")
+class MomentumStrategy(Strategy):
+    def __init__(self, universe: list[str], lookback: int = 2, weight: float = 0.1) -> None:
         self.universe = universe
+        self.lookback = lookback
+        self.weight = weight
+        self._returns: dict[str, Returns] = {}
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> MomentumStrategy:
+        return cls(
+            config.get("symbols", DEFAULT_SYMBOLS),
+            lookback=int(config.get("lookback", 2)),
+            weight=float(config.get("weight", 0.1)),
+        )
+
+    def on_bar(self, symbol: str, bar: Bar) -> float:
+        returns = self._returns.get(symbol)
+        if returns is None:
+            returns = self._returns[symbol] = Returns(self.lookback - 1)
+        return self.weight if returns.update(bar.close) > 0 else 0.0
+
+    def reset(self) -> None:
+        super().reset()
+        self._returns.clear()
 
     def generate_targets(self, market_data: dict[str, list[float]]) -> dict[str, float]:
         targets: dict[str, float] = {}
         for symbol in self.universe:
-            series = market_data[symbol]
-            targets[symbol] = 0.1 if series[-1] > series[0] else 0.0
+            series = market_data.get(symbol)
+            if not series:
+                continue
+            series = series[-self.lookback :]
+            targets[symbol] = self.weight if series[-1] > series[0] else 0.0
         return targets
 
+    def target_weights(self, closes: np.ndarray) -> np.ndarray:
+        weights = np.zeros(closes.shape, dtype=np.float64)
+        shift = self.lookback - 1
+        rising = closes[shift:] > closes[: closes.shape[0] - shift]
+        weights[shift:][rising] = self.weight
+        return weights
 
-class MeanReversionStrategy(Strategy):
-    name = "mean_reversion"
 
-    def __init__(self, universe: list[str]) -> None:
+@register_strategy("mean_reversion")
+class MeanReversionStrategy(Strategy):
+    def __init__(
+        self,
+        universe: list[str],
+        lookback: int = 2,
+        threshold: float = 0.02,
+        weight: float = 0.08,
+    ) -> None:
         self.universe = universe
+        self.lookback = lookback
+        self.threshold = threshold
+        self.weight = weight
+        self._means: dict[str, SMA] = {}
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> MeanReversionStrategy:
+        return cls(
+            config.get("symbols", DEFAULT_SYMBOLS),
+            lookback=int(config.get("lookback", 2)),
+            threshold=float(config.get("threshold", 0.02)),
+            weight=float(config.get("weight", 0.08)),
+        )
+
+    def on_bar(self, symbol: str, bar: Bar) -> float:
+        mean = self._means.get(symbol)
+        if mean is None:
+            mean = self._means[symbol] = SMA(self.lookback)
+        return self.weight if bar.close < mean.update(bar.close) * (1 - self.threshold) else 0.0
+
+    def reset(self) -> None:
+        super().reset()
+        self._means.clear()
 
     def generate_targets(self, market_data: dict[str, list[float]]) -> dict[str, float]:
         targets: dict[str, float] = {}
         for symbol in self.universe:
-            series = market_data[symbol]
+            series = market_data.get(symbol)
+            if not series:
+                continue
+            series = series[-self.lookback :]
             mean = sum(series) / len(series)
-            targets[symbol] = 0.08 if series[-1] < mean * 0.98 else 0.0
+            targets[symbol] = self.weight if series[-1] < mean * (1 - self.threshold) else 0.0
         return targets
 
+    def target_weights(self, closes: np.ndarray) -> np.ndarray:
+        weights = np.zeros(closes.shape, dtype=np.float64)
+        if closes.shape[0] < self.lookback:
+            return weights
+        csum = np.cumsum(closes, axis=0)
+        window_sum = csum[self.lookback - 1 :].copy()
+        window_sum[1:] -= csum[: closes.shape[0] - self.lookback]
+        mean = window_sum / self.lookback
+        below = closes[self.lookback - 1 :] < mean * (1 - self.threshold)
+        weights[self.lookback - 1 :][below] = self.weight
+        return weights
+
 
 def build_strategy(name: str, config: dict[str, Any]) -> Strategy:
-    symbols = config.get("symbols", ["BTCUSD", "ETHUSD"])
-    if name == "momentum":
-        return MomentumStrategy(symbols)
-    if name == "mean_reversion":
-        return MeanReversionStrategy(symbols)
-    raise ValueError(f"Unknown strategy {name}")
+    from app.bars import timeframe_seconds
+
+    cls = STRATEGIES.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown strategy {name}")
+    strategy = cls.from_config(config)
+    strategy.allocation = float(config.get("allocation", 1.0))
+    strategy.timeframe = str(config.get("timeframe", "1m"))
+    timeframe_seconds(strategy.timeframe)
+    return strategy
+
+
+def strategy_key(row: dict[str, Any]) -> tuple[int, str, str]:
+    digest = hashlib.sha1(row["config"].encode(), usedforsecurity=False).hexdigest()
+    return row["id"], row["version"], f"{row['name']}:{digest[:16]}"
+
+
+class StrategyCache:
+    def __init__(self) -> None:
+        load_strategy_plugins()
+        self._lock = threading.Lock()
+        self._version: tuple[int, int] | None = None
+        self._instances: dict[tuple[int, str, str], Strategy] = {}
+        self._enabled: list[tuple[dict[str, Any], Strategy]] = []
+        self.builds = 0
+
+    def enabled(self) -> list[tuple[dict[str, Any], Strategy]]:
+        with self._lock:
+            version = db.table_version("strategies")
+            if version != self._version:
+                self._reload(db.list_strategies())
+                self._version = version
+            return list(self._enabled)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+    def _reload(self, rows: list[dict[str, Any]]) -> None:
+        instances: dict[tuple[int, str, str], Strategy] = {}
+        enabled = []
+        for row in rows:
+            if not row["enabled"]:
+                continue
+            key = strategy_key(row)
+            strategy = self._instances.get(key)
+            if strategy is None:
+                try:
+                    strategy = build_strategy(row["name"], json.loads(row["config"]))
+                except ValueError:
+                    logger.exception("skipping strategy %s (%s)", row["id"], row["name"])
+                    continue
+                self.builds += 1
+            instances[key] = strategy
+            enabled.append((row, strategy))
+        self._instances = instances
+        self._enabled = enabled
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+
+from app.bars import COLUMNS, Bar, BarStore, BarWindow
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUOTE_DTYPE = np.dtype([("ts", "<f8"), ("bid", "<f8"), ("ask", "<f8")])
+BAR_DTYPE = np.dtype(list(COLUMNS.items()))
+
+
+@dataclass(frozen=True, slots=True)
+class QuoteEvent:
+    symbol: str
+    ts: float
+    bid: float
+    ask: float
+
+
+@dataclass(frozen=True, slots=True)
+class BarEvent:
+    symbol: str
+    bar: Bar
+
+
+class RingBuffer:
+    def __init__(self, capacity: int, dtype: np.dtype[Any]) -> None:
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=dtype)
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, row: tuple[Any, ...]) -> None:
+        with self._lock:
+            self._data[self._next] = row
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def latest(self) -> np.void | None:
+        with self._lock:
+            if not self._size:
+                return None
+            return self._data[self._next - 1].copy()
+
+    def _last(self, count: int) -> np.ndarray:
+        count = min(count, self._size)
+        start = self._next - count
+        if start >= 0:
+            return self._data[start : self._next].copy()
+        return np.concatenate((self._data[start:], self._data[: self._next]))
+
+    def last(self, count: int) -> np.ndarray:
+        with self._lock:
+            return self._last(count)
+
+    def since(self, ts: float) -> np.ndarray:
+        with self._lock:
+            count = 0
+            while count < self._size and self._data[self._next - 1 - count]["ts"] > ts:
+                count += 1
+            return self._last(count)
+
+
+class BarAggregator:
+    def __init__(self, seconds: int = 60) -> None:
+        self.seconds = seconds
+        self._open: list[float] | None = None
+        self._start = 0
+
+    def update(self, ts: float, price: float) -> Bar | None:
+        start = int(ts) // self.seconds * self.seconds
+        completed = None
+        if self._open is not None and start != self._start:
+            o, h, low, c, v = self._open
+            completed = Bar(ts=self._start, open=o, high=h, low=low, close=c, volume=v)
+            self._open = None
+        if self._open is None:
+            self._open = [price, price, price, price, 0.0]
+            self._start = start
+        bar = self._open
+        bar[1] = max(bar[1], price)
+        bar[2] = min(bar[2], price)
+        bar[3] = price
+        bar[4] += 1
+        return completed
+
+
+class MarketDataSource(ABC):
+    provides_bars: bool = False
+
+    @abstractmethod
+    def stream(self, symbols: list[str]) -> AsyncIterator[QuoteEvent | BarEvent]: ...
+
+
+class SimulatedFeed(MarketDataSource):
+    def __init__(
+        self,
+        prices: dict[str, float] | None = None,
+        interval_seconds: float = 0.25,
+        volatility: float = 0.0005,
+        seed: int = 7,
+    ) -> None:
+        self.prices = dict(prices or {"BTCUSD": 50000.0, "ETHUSD": 3000.0})
+        self.interval_seconds = interval_seconds
+        self.volatility = volatility
+        self.seed = seed
+
+    async def stream(self, symbols: list[str]) -> AsyncIterator[QuoteEvent | BarEvent]:
+        rng = random.Random(self.seed)
+        prices = {symbol: self.prices.get(symbol, 100.0) for symbol in symbols}
+        while True:
+            now = time.time()
+            for symbol in symbols:
+                prices[symbol] *= 1 + rng.gauss(0.0, self.volatility)
+                spread = prices[symbol] * 0.0001
+                yield QuoteEvent(symbol, now, prices[symbol], prices[symbol] + spread)
+            await asyncio.sleep(self.interval_seconds)
+
+
+class AlpacaCryptoStream(MarketDataSource):
+    provides_bars = True
+
+    def __init__(self, url: str | None = None) -> None:
+        self.url = url or settings.alpaca_stream_url
+
+    async def stream(self, symbols: list[str]) -> AsyncIterator[QuoteEvent | BarEvent]:
+        try:
+            import websockets
+        except ImportError as exc:
+            raise RuntimeError("MARKET_STREAM=alpaca requires the websockets package") from exc
+
+        async with websockets.connect(self.url) as socket:
+            await socket.send(
+                json.dumps(
+                    {
+                        "action": "auth",
+                        "key": settings.alpaca_api_key,
+                        "secret": settings.alpaca_secret_key,
+                    }
+                )
+            )
+            await socket.send(
+                json.dumps({"action": "subscribe", "quotes": symbols, "bars": symbols})
+            )
+            async for raw in socket:
+                for message in json.loads(raw):
+                    event = parse_alpaca_message(message)
+                    if event is not None:
+                        yield event
+
+
+def parse_alpaca_message(message: dict[str, Any]) -> QuoteEvent | BarEvent | None:
+    kind = message.get("T")
+    if kind == "error":
+        raise RuntimeError(f"Alpaca stream error: {message.get('msg')}")
+    if kind == "q":
+        ts = _parse_ts(message["t"])
+        return QuoteEvent(message["S"], ts, float(message["bp"]), float(message["ap"]))
+    if kind == "b":
+        bar = Bar(
+            ts=int(_parse_ts(message["t"])),
+            open=float(message["o"]),
+            high=float(message["h"]),
+            low=float(message["l"]),
+            close=float(message["c"]),
+            volume=float(message["v"]),
+        )
+        return BarEvent(message["S"], bar)
+    return None
+
+
+def _parse_ts(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class MarketDataService:
+    def __init__(
+        self,
+        source: MarketDataSource,
+        symbols: list[str],
+        bar_store: BarStore | None = None,
+        quote_capacity: int | None = None,
+        bar_capacity: int | None = None,
+    ) -> None:
+        self.source = source
+        self.symbols = list(symbols)
+        self.bar_store = bar_store
+        self.quote_capacity = quote_capacity or settings.market_stream_quote_capacity
+        self.bar_capacity = bar_capacity or settings.market_stream_bar_capacity
+        self.quotes: dict[str, RingBuffer] = {}
+        self.bars: dict[str, RingBuffer] = {}
+        self._aggregators: dict[str, BarAggregator] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        for symbol in self.symbols:
+            self._ensure(symbol)
+
+    def _ensure(self, symbol: str) -> None:
+        if symbol not in self.quotes:
+            self.quotes[symbol] = RingBuffer(self.quote_capacity, QUOTE_DTYPE)
+            self.bars[symbol] = RingBuffer(self.bar_capacity, BAR_DTYPE)
+            self._aggregators[symbol] = BarAggregator()
+
+    def handle(self, event: QuoteEvent | BarEvent) -> None:
+        self._ensure(event.symbol)
+        if isinstance(event, QuoteEvent):
+            self.quotes[event.symbol].append((event.ts, event.bid, event.ask))
+            if not self.source.provides_bars:
+                bar = self._aggregators[event.symbol].update(event.ts, event.bid)
+                if bar is not None:
+                    self._add_bar(event.symbol, bar)
+        else:
+            self._add_bar(event.symbol, event.bar)
+
+    def _add_bar(self, symbol: str, bar: Bar) -> None:
+        self.bars[symbol].append((bar.ts, bar.open, bar.high, bar.low, bar.close, bar.volume))
+        if self.bar_store is not None:
+            self.bar_store.append(symbol, "1m", BarWindow.from_bars([bar]))
+
+    def latest_prices(
+        self, symbols: list[str], max_age_seconds: float | None = None
+    ) -> tuple[dict[str, float], float | None]:
+        max_age = (
+            settings.market_stream_max_quote_age_seconds
+            if max_age_seconds is None
+            else max_age_seconds
+        )
+        now = time.time()
+        prices: dict[str, float] = {}
+        oldest: float | None = None
+        for symbol in symbols:
+            buffer = self.quotes.get(symbol)
+            quote = buffer.latest() if buffer is not None else None
+            if quote is None or now - float(quote["ts"]) > max_age:
+                continue
+            prices[symbol] = float(quote["bid"])
+            oldest = float(quote["ts"]) if oldest is None else min(oldest, float(quote["ts"]))
+        return prices, oldest
+
+    def closes(self, symbol: str, count: int) -> np.ndarray:
+        buffer = self.bars.get(symbol)
+        if buffer is None:
+            return np.empty(0)
+        return buffer.last(count)["close"]
+
+    def bars_since(self, symbol: str, ts: int | None, count: int) -> BarWindow:
+        buffer = self.bars.get(symbol)
+        if buffer is None:
+            return BarWindow.empty()
+        rows = buffer.last(count) if ts is None else buffer.since(ts)
+        return BarWindow(**{name: rows[name] for name in COLUMNS})
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._consume()), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def _consume(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                async for event in self.source.stream(self.symbols):
+                    if self._stop.is_set():
+                        return
+                    self.handle(event)
+                    backoff = 1.0
+            except Exception:
+                logger.exception("market data stream failed; reconnecting in %.0fs", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+def build_market_stream(symbols: list[str], bar_store: BarStore | None) -> MarketDataService | None:
+    if settings.market_stream == "alpaca":
+        return MarketDataService(AlpacaCryptoStream(), symbols, bar_store)
+    if settings.market_stream == "simulated":
+        return MarketDataService(SimulatedFeed(), symbols)
+    return None
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app import db
+from app.backtest import BacktestConfig, BarData, run_backtest
+from app.bars import BarStore
+from app.strategies import build_strategy
+
+METRICS = ("total_return", "max_drawdown", "sharpe", "turnover", "trades", "costs_paid")
+BAR_FIELDS = ("timestamps", "open", "high", "low", "close", "volume")
+
+_worker_bars: BarData | None = None
+
+
+def expand_grid(grid: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    names = list(grid)
+    return [dict(zip(names, values, strict=True)) for values in itertools.product(*grid.values())]
+
+
+def _init_worker(data_dir: str, symbols: list[str]) -> None:
+    global _worker_bars
+    arrays = {name: np.load(Path(data_dir) / f"{name}.npy", mmap_mode="r") for name in BAR_FIELDS}
+    _worker_bars = BarData(symbols=symbols, **arrays)
+
+
+def _run_point(
+    strategy_name: str,
+    base_config: dict[str, Any],
+    params: dict[str, Any],
+    backtest_config: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    if _worker_bars is None:
+        raise RuntimeError("sweep worker was not initialised with bar data")
+    strategy = build_strategy(strategy_name, {**base_config, **params})
+    result = run_backtest(strategy, _worker_bars, BacktestConfig(**backtest_config))
+    return params, {metric: result.summary[metric] for metric in METRICS}
+
+
+def run_sweep(
+    strategy_name: str,
+    grid: dict[str, list[Any]],
+    symbols: list[str],
+    timeframe: str = "1m",
+    start: int | None = None,
+    end: int | None = None,
+    backtest_config: BacktestConfig | None = None,
+    workers: int | None = None,
+    store: BarStore | None = None,
+) -> str:
+    bars = (store or BarStore()).load(symbols, timeframe, start, end)
+    if not len(bars.timestamps):
+        raise ValueError("No bars in the requested range")
+    sweep_id = uuid.uuid4().hex[:12]
+    base_config = {"symbols": symbols, "timeframe": timeframe}
+    config = asdict(backtest_config or BacktestConfig())
+    data_dir = tempfile.mkdtemp(prefix=f"kudan-sweep-{sweep_id}-")
+    try:
+        for name in BAR_FIELDS:
+            np.save(Path(data_dir) / f"{name}.npy", getattr(bars, name))
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(data_dir, symbols),
+        ) as pool:
+            futures = [
+                pool.submit(_run_point, strategy_name, base_config, params, config)
+                for params in expand_grid(grid)
+            ]
+            for future in as_completed(futures):
+                params, metrics = future.result()
+                db.insert_sweep_result(sweep_id, strategy_name, params, metrics)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return sweep_id
+
+
+def sweep_heatmap(
+    sweep_id: str,
+    x: str,
+    y: str,
+    metric: str = "sharpe",
+    fixed: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    fixed = fixed or {}
+    rows = [
+        row
+        for row in db.list_sweep_results(sweep_id)
+        if all(row["params"].get(name) == value for name, value in fixed.items())
+    ]
+    x_values = sorted({row["params"][x] for row in rows})
+    y_values = sorted({row["params"][y] for row in rows})
+    cells: list[list[float | None]] = [[None] * len(x_values) for _ in y_values]
+    for row in rows:
+        i = y_values.index(row["params"][y])
+        j = x_values.index(row["params"][x])
+        value, current = row["metrics"][metric], cells[i][j]
+        if current is None or value > current:
+            cells[i][j] = value
+    return {
+        "x": x,
+        "y": y,
+        "metric": metric,
+        "fixed": fixed,
+        "aggregate": "max",
+        "x_values": x_values,
+        "y_values": y_values,
+        "values": cells,
+    }
+
+
+def sweep_sensitivity(sweep_id: str, metric: str = "sharpe") -> dict[str, Any]:
+    rows = db.list_sweep_results(sweep_id)
+    if not rows:
+        return {"metric": metric, "best": None}
+    axes = {name: sorted({row["params"][name] for row in rows}) for name in rows[0]["params"]}
+    best = max(rows, key=lambda row: row["metrics"][metric])
+    neighbours = []
+    for row in rows:
+        steps = [
+            abs(axes[name].index(row["params"][name]) - axes[name].index(best["params"][name]))
+            for name in axes
+        ]
+        if sum(steps) == 1:
+            neighbours.append(row["metrics"][metric])
+    return {
+        "metric": metric,
+        "best": best["metrics"][metric],
+        "best_params": best["params"],
+        "neighbour_median": statistics.median(neighbours) if neighbours else None,
+        "neighbour_min": min(neighbours) if neighbours else None,
+    }
+
+
+def _parse_grid(items: list[str]) -> dict[str, list[Any]]:
+    grid: dict[str, list[Any]] = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        grid[name] = [json.loads(value) for value in values.split(",")]
+    return grid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a backtest parameter sweep")
+    parser.add_argument("strategy")
+    parser.add_argument("--grid", action="append", default=[], help="name=v1,v2,...")
+    parser.add_argument("--symbols", default="BTCUSD,ETHUSD")
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--start", type=int)
+    parser.add_argument("--end", type=int)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    db.init_db()
+    grid = _parse_grid(args.grid)
+    sweep_id = run_sweep(
+        args.strategy,
+        grid,
+        args.symbols.split(","),
+        timeframe=args.timeframe,
+        start=args.start,
+        end=args.end,
+        workers=args.workers,
+    )
+    print(json.dumps({"sweep_id": sweep_id, "sensitivity": sweep_sensitivity(sweep_id)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from collections.abc import Callable
+
+import httpx
+
+from app.broker import AlpacaCryptoBroker
+from app.config import settings
+from benchmarks.fake_alpaca import serve
+
+
+def per_call_client(broker: AlpacaCryptoBroker) -> Callable[[], None]:
+    def call() -> None:
+        with httpx.Client(timeout=10.0) as client:
+            response = client.get(f"{broker.base_url}/v2/account", headers=broker.headers)
+            response.raise_for_status()
+            response.json()
+
+    return call
+
+
+def pooled_client(broker: AlpacaCryptoBroker) -> Callable[[], None]:
+    def call() -> None:
+        broker.get_account()
+
+    return call
+
+
+def measure(call: Callable[[], None], iterations: int) -> dict[str, float]:
+    call()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p99_ms": samples[int(len(samples) * 0.99) - 1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-call overhead of the Alpaca HTTP client")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    settings.alpaca_api_key = settings.alpaca_api_key or "bench-key"
+    settings.alpaca_secret_key = settings.alpaca_secret_key or "bench-secret"
+    with serve() as base_url:
+        settings.alpaca_base_url = base_url
+        broker = AlpacaCryptoBroker()
+        try:
+            results = {
+                "per_call_client": measure(per_call_client(broker), args.iterations),
+                "pooled_client": measure(pooled_client(broker), args.iterations),
+            }
+        finally:
+            broker.close()
+    results["speedup_mean"] = (
+        results["per_call_client"]["mean_ms"] / results["pooled_client"]["mean_ms"]
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
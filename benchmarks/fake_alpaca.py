@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+PRICES = {"BTCUSD": 50000.0, "ETHUSD": 3000.0}
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+SERVER_ERRORS = (500, 502, 503, 504)
+
+
+@dataclass(frozen=True, slots=True)
+class Latency:
+    distribution: str = "fixed"
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str) -> Latency:
+        distribution, _, rest = value.partition(":")
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        numbers = [float(part) for part in rest.split(":") if part]
+        return cls(distribution, *numbers)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "uniform":
+            extra = rng.uniform(0, self.jitter_ms)
+        elif self.distribution == "exponential":
+            extra = rng.expovariate(1 / self.jitter_ms) if self.jitter_ms > 0 else 0.0
+        elif self.distribution == "lognormal":
+            extra = self.jitter_ms * rng.lognormvariate(0.0, 1.0)
+        else:
+            extra = 0.0
+        return (self.base_ms + extra) / 1000
+
+
+@dataclass(frozen=True, slots=True)
+class FakeAlpacaConfig:
+    latency: Latency = Latency()
+    order_latency: Latency | None = None
+    error_429_rate: float = 0.0
+    error_5xx_rate: float = 0.0
+    accept_then_fail_rate: float = 0.0
+    rate_limit_per_minute: int = 0
+    seed: int = 0
+    volatility: float = 0.001
+    equity: float = 100000.0
+
+
+class PriceProcess:
+    def __init__(self, seed: int, volatility: float) -> None:
+        self.seed = seed
+        self.volatility = volatility
+        self._prices: dict[str, float] = {}
+        self._rngs: dict[str, random.Random] = {}
+
+    def price(self, symbol: str) -> float:
+        return self._prices.get(symbol, PRICES.get(symbol, 100.0))
+
+    def step(self, symbol: str) -> float:
+        rng = self._rngs.get(symbol)
+        if rng is None:
+            rng = self._rngs[symbol] = random.Random(f"{self.seed}:{symbol}")
+        shock = rng.gauss(-0.5 * self.volatility**2, self.volatility)
+        self._prices[symbol] = self.price(symbol) * math.exp(shock)
+        return self._prices[symbol]
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int, clock: Any = time.monotonic) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def take(self) -> tuple[bool, float]:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+@dataclass(slots=True)
+class FakeAlpacaState:
+    config: FakeAlpacaConfig = FakeAlpacaConfig()
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    positions: dict[str, float] = field(default_factory=dict)
+    orders: dict[str, dict[str, Any]] = field(default_factory=dict)
+    placements: Counter[str] = field(default_factory=Counter)
+    responses: Counter[str] = field(default_factory=Counter)
+    cash: float = 0.0
+    prices: PriceProcess = field(init=False)
+    rng: random.Random = field(init=False)
+    bucket: TokenBucket | None = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.cash = self.cash or self.config.equity
+        self.prices = PriceProcess(self.config.seed, self.config.volatility)
+        self.rng = random.Random(self.config.seed)
+        per_minute = self.config.rate_limit_per_minute
+        self.bucket = TokenBucket(per_minute) if per_minute > 0 else None
+
+    def delay(self, path: str) -> float:
+        latency = self.config.latency
+        if path == "/v2/orders" and self.config.order_latency is not None:
+            latency = self.config.order_latency
+        with self.lock:
+            return latency.sample(self.rng)
+
+    def fault(self) -> tuple[int, dict[str, str]] | None:
+        with self.lock:
+            if self.bucket is not None:
+                allowed, retry_after = self.bucket.take()
+                if not allowed:
+                    return 429, {
+                        "X-RateLimit-Limit": str(self.config.rate_limit_per_minute),
+                        "X-RateLimit-Remaining": "0",
+                        "Retry-After": str(math.ceil(retry_after)),
+                    }
+            roll = self.rng.random()
+            if roll < self.config.error_429_rate:
+                return 429, {"Retry-After": "1"}
+            if roll < self.config.error_429_rate + self.config.error_5xx_rate:
+                return self.rng.choice(SERVER_ERRORS), {}
+        return None
+
+    def lost_response(self) -> int | None:
+        with self.lock:
+            if self.rng.random() >= self.config.accept_then_fail_rate:
+                return None
+            return self.rng.choice((0, *SERVER_ERRORS))
+
+    def account(self) -> dict[str, str]:
+        with self.lock:
+            equity = self.cash + sum(
+                qty * self.prices.price(symbol) for symbol, qty in self.positions.items()
+            )
+            return {"equity": f"{equity:.2f}", "cash": f"{self.cash:.2f}"}
+
+    def position_rows(self) -> list[dict[str, str]]:
+        with self.lock:
+            return [
+                {
+                    "symbol": symbol,
+                    "qty": str(qty),
+                    "market_value": f"{qty * self.prices.price(symbol):.2f}",
+                }
+                for symbol, qty in self.positions.items()
+                if qty != 0
+            ]
+
+    def quotes(self, symbols: list[str]) -> dict[str, Any]:
+        with self.lock:
+            prices = {symbol: self.prices.step(symbol) for symbol in symbols}
+        return {"quotes": {s: {"bp": p, "ap": p * 1.0001} for s, p in prices.items()}}
+
+    def place(self, payload: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        client_id = payload.get("client_order_id") or str(uuid.uuid4())
+        symbol, side, qty = payload["symbol"], payload["side"], float(payload["qty"])
+        with self.lock:
+            if client_id in self.orders:
+                return 422, {"code": 40010001, "message": "client_order_id must be unique"}
+            price = self.prices.price(symbol)
+            limit = payload.get("limit_price")
+            filled = limit is None or (price <= limit if side == "buy" else price >= limit)
+            if filled:
+                signed = qty if side == "buy" else -qty
+                self.positions[symbol] = self.positions.get(symbol, 0.0) + signed
+                self.cash -= signed * price
+            order = {
+                "id": str(uuid.uuid4()),
+                "client_order_id": client_id,
+                "symbol": symbol,
+                "side": side,
+                "qty": str(qty),
+                "type": payload.get("type", "market"),
+                "limit_price": limit,
+                "status": "filled" if filled else "new",
+                "filled_avg_price": str(price) if filled else None,
+            }
+            self.orders[client_id] = order
+            self.placements[client_id] += 1
+            return 200, order
+
+    def order_by_client_id(self, client_id: str) -> dict[str, Any] | None:
+        with self.lock:
+            return self.orders.get(client_id)
+
+    def cancel(self, order_id: str) -> dict[str, Any]:
+        with self.lock:
+            for order in self.orders.values():
+                if order["id"] == order_id and order["status"] == "new":
+                    order["status"] = "canceled"
+        return {"id": order_id, "status": "canceled"}
+
+    def count(self, status: int | str) -> None:
+        with self.lock:
+            self.responses[str(status)] += 1
+
+
+class FakeAlpacaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], state: FakeAlpacaState) -> None:
+        super().__init__(address, FakeAlpacaHandler)
+        self.state = state
+
+
+class FakeAlpacaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: FakeAlpacaServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return None
+
+    def _send(self, payload: Any, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.state.count(status)
+
+    def _begin(self, path: str) -> bool:
+        state = self.server.state
+        delay = state.delay(path)
+        if delay > 0:
+            time.sleep(delay)
+        fault = state.fault()
+        if fault is None:
+            return True
+        status, headers = fault
+        self._send({"code": status, "message": "injected fault"}, status, headers)
+        return False
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if not self._begin(url.path):
+            return
+        state = self.server.state
+        query = parse_qs(url.query)
+        if url.path == "/v2/account":
+            self._send(state.account())
+        elif url.path == "/v2/positions":
+            self._send(state.position_rows())
+        elif url.path == "/v1beta3/crypto/us/latest/quotes":
+            symbols = [s for s in query.get("symbols", [""])[0].split(",") if s]
+            self._send(state.quotes(symbols))
+        elif url.path == "/v2/orders:by_client_order_id":
+            order = state.order_by_client_id(query.get("client_order_id", [""])[0])
+            if order is None:
+                self._send({"message": "order not found"}, status=404)
+            else:
+                self._send(order)
+        else:
+            self._send({"message": "not found"}, status=404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", "0"))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not self._begin(url.path):
+            return
+        if url.path != "/v2/orders":
+            self._send({"message": "not found"}, status=404)
+            return
+        state = self.server.state
+        status, body = state.place(payload)
+        lost = state.lost_response() if status == 200 else None
+        if lost == 0:
+            self.close_connection = True
+            state.count("dropped")
+        elif lost is not None:
+            self._send({"code": lost, "message": "injected fault after accept"}, lost)
+        else:
+            self._send(body, status=status)
+
+    def do_DELETE(self) -> None:
+        url = urlparse(self.path)
+        if not self._begin(url.path):
+            return
+        self._send(self.server.state.cancel(url.path.rsplit("/", 1)[-1]))
+
+
+@contextmanager
+def serve(
+    state: FakeAlpacaState | None = None, host: str = "127.0.0.1", port: int = 0
+) -> Iterator[str]:
+    server = FakeAlpacaServer((host, port), state or FakeAlpacaState())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=Latency.parse, default=Latency())
+    parser.add_argument("--order-latency", type=Latency.parse, default=None)
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--error-5xx-rate", type=float, default=0.0)
+    parser.add_argument("--accept-then-fail-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--volatility", type=float, default=0.001)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeAlpacaConfig:
+    return FakeAlpacaConfig(
+        latency=args.latency,
+        order_latency=args.order_latency,
+        error_429_rate=args.error_429_rate,
+        error_5xx_rate=args.error_5xx_rate,
+        accept_then_fail_rate=args.accept_then_fail_rate,
+        rate_limit_per_minute=args.rate_limit,
+        seed=args.seed,
+        volatility=args.volatility,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Alpaca REST endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    state = FakeAlpacaState(config_from_args(args))
+    with serve(state, args.host, args.port) as base_url:
+        print(f"fake alpaca listening on {base_url}", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    print(json.dumps(dict(state.responses)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from contextlib import ExitStack
+from typing import Any
+
+import httpx
+
+from app.broker import (
+    AlpacaCryptoBroker,
+    AsyncAlpacaCryptoBroker,
+    AsyncBrokerMock,
+    BrokerMock,
+)
+from app.config import settings
+from app.execution import OrderExecutor
+from benchmarks.fake_alpaca import FakeAlpacaState, add_config_arguments, config_from_args, serve
+
+SYMBOLS = ["BTCUSD", "ETHUSD", "SOLUSD", "LTCUSD"]
+OPERATIONS = ("account", "positions", "quotes", "order")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, Counter[str]] = defaultdict(Counter)
+        self.decisions: list[dict[str, Any]] = []
+
+    def record(self, op: str, seconds: float, error: str | None) -> None:
+        with self.lock:
+            self.samples[op].append(seconds * 1000)
+            if error is not None:
+                self.errors[op][error] += 1
+
+    def order(self, decision: dict[str, Any], seconds: float) -> None:
+        with self.lock:
+            self.decisions.append(decision)
+        self.record("order", seconds, outcome(decision))
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        ops = {}
+        for op, samples in sorted(self.samples.items()):
+            samples.sort()
+            ops[op] = {
+                "count": len(samples),
+                "errors": dict(self.errors[op]),
+                "throughput_rps": len(samples) / elapsed,
+                "mean_ms": statistics.fmean(samples),
+                "p50_ms": percentile(samples, 0.50),
+                "p90_ms": percentile(samples, 0.90),
+                "p99_ms": percentile(samples, 0.99),
+                "p999_ms": percentile(samples, 0.999),
+                "max_ms": samples[-1],
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        return {"elapsed_s": elapsed, "throughput_rps": total / elapsed, "ops": ops}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+        mix[op] = float(weight or 1)
+    return mix
+
+
+def error_label(error: Exception) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return str(error.response.status_code)
+    return type(error).__name__
+
+
+def order_decision(rng: random.Random) -> dict[str, Any]:
+    return {
+        "symbol": rng.choice(SYMBOLS),
+        "side": rng.choice(("buy", "sell")),
+        "qty": round(rng.uniform(0.001, 0.01), 6),
+        "strategies": {"load": 1.0},
+    }
+
+
+def outcome(decision: dict[str, Any]) -> str | None:
+    if decision["status"] == "submitted":
+        return None
+    return decision["reasons"][0].split(":", 1)[0]
+
+
+def reconcile(state: FakeAlpacaState, decisions: list[dict[str, Any]]) -> dict[str, Any]:
+    submitted = Counter(d["client_order_id"] for d in decisions)
+    duplicates = sorted(cid for cid, count in submitted.items() if count > 1)
+    duplicates += sorted(cid for cid, count in state.placements.items() if count > 1)
+    mismatched = sorted(
+        d["client_order_id"]
+        for d in decisions
+        if d["status"] == "submitted"
+        and state.orders.get(d["client_order_id"], {}).get("id") != d["order_id"]
+    )
+    unknown = sorted(
+        d["client_order_id"]
+        for d in decisions
+        if d["status"] != "submitted" and d["client_order_id"] in state.orders
+    )
+    return {
+        "client_order_ids": len(submitted),
+        "server_orders": len(state.orders),
+        "duplicates": duplicates,
+        "mismatched": mismatched,
+        "accepted_but_failed": len(unknown),
+        "ok": not duplicates and not mismatched,
+    }
+
+
+def run_sync(args: argparse.Namespace, recorder: Recorder) -> None:
+    broker = AlpacaCryptoBroker()
+    executor = OrderExecutor(
+        broker, AsyncBrokerMock(), args.concurrency, args.max_retries, args.backoff
+    )
+    run_ids = itertools.count(1)
+    deadline = time.perf_counter() + args.duration
+    ops, weights = zip(*args.mix.items(), strict=True)
+    calls: dict[str, Callable[[], Any]] = {
+        "account": broker.get_account,
+        "positions": broker.get_positions,
+        "quotes": lambda: broker.get_latest_prices(SYMBOLS),
+    }
+
+    def worker(index: int) -> None:
+        rng = random.Random(f"{args.seed}:{index}")
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, weights)[0]
+            started = time.perf_counter()
+            if op == "order":
+                decision = order_decision(rng)
+                executor.submit(next(run_ids), [decision])
+                recorder.order(decision, time.perf_counter() - started)
+                continue
+            error = None
+            try:
+                calls[op]()
+            except Exception as exc:
+                error = error_label(exc)
+            recorder.record(op, time.perf_counter() - started, error)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        executor.close()
+        broker.close()
+
+
+async def run_async(args: argparse.Namespace, recorder: Recorder) -> None:
+    broker = AsyncAlpacaCryptoBroker()
+    executor = OrderExecutor(BrokerMock(), broker, args.concurrency, args.max_retries, args.backoff)
+    run_ids = itertools.count(1)
+    deadline = time.perf_counter() + args.duration
+    ops, weights = zip(*args.mix.items(), strict=True)
+    calls: dict[str, Callable[[], Awaitable[Any]]] = {
+        "account": broker.get_account,
+        "positions": broker.get_positions,
+        "quotes": lambda: broker.get_latest_prices(SYMBOLS),
+    }
+
+    async def worker(index: int) -> None:
+        rng = random.Random(f"{args.seed}:{index}")
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, weights)[0]
+            started = time.perf_counter()
+            if op == "order":
+                decision = order_decision(rng)
+                await executor.submit_async(next(run_ids), [decision])
+                recorder.order(decision, time.perf_counter() - started)
+                continue
+            error = None
+            try:
+                await calls[op]()
+            except Exception as exc:
+                error = error_label(exc)
+            recorder.record(op, time.perf_counter() - started, error)
+
+    try:
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    finally:
+        await broker.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the Alpaca adapters end to end")
+    parser.add_argument("--mode", choices=("sync", "async"), default="async")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", type=parse_mix, default="account=1,positions=1,quotes=4,order=2")
+    parser.add_argument("--max-retries", type=int, default=settings.order_max_retries)
+    parser.add_argument("--backoff", type=float, default=settings.order_retry_backoff_seconds)
+    parser.add_argument("--url", default=None, help="Target an already running fake server")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    settings.alpaca_api_key = settings.alpaca_api_key or "bench-key"
+    settings.alpaca_secret_key = settings.alpaca_secret_key or "bench-secret"
+    state = None
+    with ExitStack() as stack:
+        if args.url is None:
+            state = FakeAlpacaState(config_from_args(args))
+            settings.alpaca_base_url = stack.enter_context(serve(state))
+        else:
+            settings.alpaca_base_url = args.url
+        recorder = Recorder()
+        started = time.perf_counter()
+        if args.mode == "async":
+            asyncio.run(run_async(args, recorder))
+        else:
+            run_sync(args, recorder)
+        report = recorder.summary(time.perf_counter() - started)
+    report["mode"] = args.mode
+    report["concurrency"] = args.concurrency
+    if state is not None:
+        report["server_responses"] = dict(state.responses)
+        report["orders"] = reconcile(state, recorder.decisions)
+    print(json.dumps(report, indent=2))
+    if state is not None and not report["orders"]["ok"]:
+        print("client_order_id did not map to exactly one order", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Any
+
+from app import db
+from app.broker import Account, BrokerMock
+from app.config import settings
+from app.portfolio import NetTarget, OrderIntent
+from app.risk import RiskGovernor
+from app.runner import StrategyRunner
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+@dataclass(slots=True)
+class Case:
+    name: str
+    call: Callable[[], Any]
+    iterations: int
+    setup: Callable[[], None] | None = None
+    teardown: Callable[[], None] | None = None
+
+
+def measure(case: Case, warmup: int = 3) -> dict[str, float]:
+    if case.setup is not None:
+        case.setup()
+    try:
+        for _ in range(warmup):
+            case.call()
+        samples = []
+        for _ in range(case.iterations):
+            started = time.perf_counter()
+            case.call()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        if case.teardown is not None:
+            case.teardown()
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "iterations": case.iterations,
+        "ops_per_s": 1000 / mean if mean else 0.0,
+        "mean_ms": mean,
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[max(0, int(len(samples) * 0.95) - 1)],
+        "p99_ms": samples[max(0, int(len(samples) * 0.99) - 1)],
+    }
+
+
+@contextmanager
+def isolated_settings() -> Iterator[None]:
+    saved = {
+        name: getattr(settings, name)
+        for name in ("db_path", "bar_store_path", "archive_path", "alpaca_api_key")
+    }
+    with tempfile.TemporaryDirectory(prefix="kudan-bench-") as root:
+        settings.db_path = f"{root}/kudan.sqlite"
+        settings.bar_store_path = f"{root}/bars"
+        settings.archive_path = f"{root}/archive"
+        settings.alpaca_api_key = None
+        try:
+            yield
+        finally:
+            db.close_all()
+            for name, value in saved.items():
+                setattr(settings, name, value)
+
+
+def seed(strategies: int, symbols: int, history: int) -> list[str]:
+    db.init_db()
+    universe = [f"SYM{i}USD" for i in range(symbols)]
+    now = db.utcnow_iso()
+    with db.get_conn() as conn:
+        for table in ("strategies", "orders", "runs"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.executemany(
+            "INSERT INTO strategies(name, config, enabled, mode, version) VALUES (?, ?, 1, ?, ?)",
+            [
+                (
+                    ("momentum", "mean_reversion")[i % 2],
+                    json.dumps({"symbols": universe, "lookback": 2 + i % 3}),
+                    "paper",
+                    "v1",
+                )
+                for i in range(strategies)
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO runs(created_at, status, summary, details) VALUES (?, 'ok', 'seed', ?)",
+            ((now, json.dumps({"decisions": [{"symbol": universe[0]}]})) for _ in range(history)),
+        )
+        conn.executemany(
+            """
+            INSERT INTO orders(run_id, created_at, symbol, side, qty, status, notional)
+            VALUES (?, ?, ?, 'buy', 1.0, 'risk_block', 100.0)
+            """,
+            ((i + 1, now, universe[i % symbols]) for i in range(history)),
+        )
+    return universe
+
+
+def cycle_case(strategies: int, symbols: int, history: int, iterations: int) -> Case:
+    broker = BrokerMock()
+    runner: StrategyRunner | None = None
+
+    def setup() -> None:
+        nonlocal runner
+        universe = seed(strategies, symbols, history)
+        broker.prices.update({symbol: 100.0 + i for i, symbol in enumerate(universe)})
+        runner = StrategyRunner(broker)
+        runner.order_rate.rebuild()
+
+    def call() -> None:
+        assert runner is not None
+        broker.positions.clear()
+        runner.run_once()
+
+    def teardown() -> None:
+        if runner is not None:
+            runner.close()
+
+    name = f"run_once[strategies={strategies},symbols={symbols},history={history}]"
+    return Case(name, call, iterations, setup, teardown)
+
+
+def micro_cases(iterations: int, history: int) -> list[Case]:
+    risk = RiskGovernor()
+    counter = iter(range(10**9))
+    account = Account(equity=100000.0, cash=100000.0)
+    basket = [
+        OrderIntent(f"SYM{i}USD", "buy", 1.0, 100.0, NetTarget(f"SYM{i}USD")) for i in range(20)
+    ]
+
+    def api_client() -> Any:
+        from fastapi.testclient import TestClient
+
+        from app.main import app, runner
+
+        return TestClient(app), runner
+
+    client, app_runner = api_client()
+
+    def api_state_cold() -> None:
+        app_runner.states.invalidate()
+        client.get("/api/state").raise_for_status()
+
+    return [
+        Case(
+            "risk_evaluate",
+            lambda: risk.evaluate(100000.0, 0.1, 100.0, 0),
+            iterations * 10,
+            lambda: seed(2, 2, 0),
+        ),
+        Case(
+            "risk_evaluate_orders[20]",
+            lambda: risk.evaluate_orders(account, [], basket),
+            iterations * 10,
+        ),
+        Case("get_state", lambda: db.get_state("kill_switch"), iterations * 10),
+        Case(
+            "insert_order",
+            lambda: db.insert_order(next(counter), "BTCUSD", "buy", 1.0, "submitted", "b"),
+            iterations,
+        ),
+        Case("list_runs", lambda: db.list_runs(50), iterations, lambda: seed(2, 2, history)),
+        Case("api_state", lambda: client.get("/api/state").raise_for_status(), iterations),
+        Case("api_state_uncached", api_state_cold, iterations),
+    ]
+
+
+def run_suite(
+    strategies: list[int],
+    symbols: list[int],
+    history: list[int],
+    iterations: int,
+) -> dict[str, Any]:
+    results: dict[str, dict[str, float]] = {}
+    with isolated_settings():
+        for n, m, k in product(strategies, symbols, history):
+            case = cycle_case(n, m, k, iterations)
+            results[case.name] = measure(case)
+        for case in micro_cases(iterations, max(history)):
+            results[case.name] = measure(case)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": db.utcnow_iso(),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float, metric: str = "p50_ms"
+) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    for name, stats in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            rows.append({"name": name, "baseline": None, "current": stats[metric], "missing": True})
+            continue
+        ratio = stats[metric] / previous[metric] if previous[metric] else float("inf")
+        rows.append(
+            {
+                "name": name,
+                "baseline": previous[metric],
+                "current": stats[metric],
+                "ratio": ratio,
+                "regressed": ratio > 1 + threshold,
+                "missing": False,
+            }
+        )
+    return rows
+
+
+def _ints(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the trading cycle and persistence")
+    parser.add_argument("--strategies", type=_ints, default=[2, 8])
+    parser.add_argument("--symbols", type=_ints, default=[2, 20])
+    parser.add_argument("--history", type=_ints, default=[0, 50000])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    report = run_suite(args.strategies, args.symbols, args.history, args.iterations)
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(report, indent=2) + "\n")
+
+    regressions: list[dict[str, Any]] = []
+    if args.baseline is not None and args.baseline.exists():
+        comparison = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+        report["comparison"] = comparison
+        regressions = [row for row in comparison if row.get("regressed")]
+        missing = [row["name"] for row in comparison if row["missing"]]
+        if missing:
+            print(f"not in baseline, not gated: {', '.join(missing)}", file=sys.stderr)
+    print(json.dumps(report, indent=2))
+    if regressions:
+        names = ", ".join(row["name"] for row in regressions)
+        print(f"regressions over {args.threshold:.0%}: {names}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
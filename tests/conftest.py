@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import os
+import shutil
 
 os.environ["KUDAN_DB_PATH"] = "/tmp/kudan_test.sqlite"
+os.environ["KUDAN_BAR_STORE_PATH"] = "/tmp/kudan_test_bars"
 
 import pytest
 from fastapi.testclient import TestClient
@@ -13,8 +15,11 @@ from app.main import app
 
 @pytest.fixture(autouse=True)
 def setup_db() -> None:
-    if os.path.exists("/tmp/kudan_test.sqlite"):
-        os.remove("/tmp/kudan_test.sqlite")
+    db.close_all()
+    shutil.rmtree("/tmp/kudan_test_bars", ignore_errors=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(f"/tmp/kudan_test.sqlite{suffix}"):
+            os.remove(f"/tmp/kudan_test.sqlite{suffix}")
     db.init_db()
 
 
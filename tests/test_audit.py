@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from app import db
+from app.audit import AuditRecorder, BackgroundWriter
+
+
+def test_audit_recorder_flushes_cycle_in_one_transaction() -> None:
+    audit = AuditRecorder()
+    audit.add_risk_event("block", "per_trade_risk_exceeded", {"equity": 1.0})
+    audit.add_order("BTCUSD", "buy", 0.0, "risk_block", None, "per_trade_risk_exceeded")
+    audit.set_run("partial", "Cycle executed with 1 decisions", {"decisions": []})
+    run_id = audit.flush()
+    assert db.list_runs()[0]["id"] == run_id
+    assert db.list_orders()[0]["run_id"] == run_id
+    assert db.list_risk_events()[0]["reason"] == "per_trade_risk_exceeded"
+    assert not audit.orders and not audit.risk_events and audit.run is None
+
+
+def test_audit_recorder_is_all_or_nothing() -> None:
+    audit = AuditRecorder()
+    audit.set_run("ok", "Cycle executed with 1 decisions", {"decisions": []})
+    audit.add_order(None, "buy", 1.0, "submitted", "abc")  # type: ignore[arg-type]
+    with pytest.raises(sqlite3.IntegrityError):
+        audit.flush()
+    assert db.list_runs() == []
+
+
+def test_background_writer_flushes_on_close() -> None:
+    writer = BackgroundWriter(db.insert_position_snapshots, interval_seconds=60)
+    writer.submit([(db.utcnow_iso(), "BTCUSD", 1.0, 50000.0)])
+    writer.close()
+    with db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM position_snapshots").fetchone()[0] == 1
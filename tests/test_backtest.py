@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+
+from app.backtest import BacktestConfig, BarData, run_backtest
+from app.strategies import MeanReversionStrategy, MomentumStrategy, Strategy
+
+
+def make_bars(close: np.ndarray, symbols: list[str], step: int = 60) -> BarData:
+    timestamps = 1_700_000_000 + step * np.arange(close.shape[0], dtype=np.int64)
+    return BarData(symbols, timestamps, close, close, close, close, np.ones_like(close))
+
+
+def test_vectorized_targets_match_tick_by_tick_evaluation() -> None:
+    rng = np.random.default_rng(7)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 3)), axis=0))
+    symbols = ["AUSD", "BUSD", "CUSD"]
+    for strategy in (
+        MomentumStrategy(symbols, lookback=5),
+        MeanReversionStrategy(symbols, lookback=10, threshold=0.01),
+    ):
+        expected = Strategy.target_weights(strategy, closes)
+        np.testing.assert_array_equal(strategy.target_weights(closes), expected)
+
+
+def test_backtest_applies_fees_and_per_trade_limit(tmp_path: Path) -> None:
+    close = np.column_stack([np.linspace(100, 200, 50), np.linspace(100, 200, 50)])
+    bars = make_bars(close, ["BTCUSD", "ETHUSD"])
+    strategy = MomentumStrategy(["BTCUSD", "ETHUSD"], lookback=2, weight=0.1)
+
+    free = run_backtest(
+        strategy, bars, BacktestConfig(per_trade_risk=1.0, fee_rate=0.0, slippage_bps=0)
+    )
+    assert free.summary["trades"] == 2
+    assert free.equity[-1] > free.equity[0]
+    costly = run_backtest(strategy, bars, BacktestConfig(per_trade_risk=1.0, fee_rate=0.01))
+    assert costly.equity[-1] < free.equity[-1]
+    assert costly.summary["costs_paid"] > 0
+
+    blocked = run_backtest(strategy, bars, BacktestConfig(per_trade_risk=0.05))
+    assert blocked.summary["trades"] == 0
+    assert blocked.summary["blocked"]["per_trade_risk"] == 2
+
+    out = costly.save(tmp_path / "report")
+    assert {p.name for p in out.iterdir()} == {"summary.json", "trades.json", "curves.npz"}
+
+
+def test_backtest_order_rate_limit_defers_trades() -> None:
+    close = np.column_stack([np.linspace(100, 110, 180)] * 2)
+    bars = make_bars(close, ["BTCUSD", "ETHUSD"])
+    strategy = MomentumStrategy(["BTCUSD", "ETHUSD"], lookback=2, weight=0.1)
+    result = run_backtest(strategy, bars, BacktestConfig(per_trade_risk=1.0, max_orders_per_hour=1))
+    assert [t["symbol"] for t in result.trades] == ["BTCUSD", "ETHUSD"]
+    assert result.trades[1]["timestamp"] - result.trades[0]["timestamp"] == 3600
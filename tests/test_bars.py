@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.bars import Bar, BarStore, BarWindow
+from app.broker import BrokerMock
+from app.market import MarketSnapshot
+from app.runner import StrategyRunner, market_data_for
+from app.strategies import MomentumStrategy
+
+
+def make_window(start: int, count: int, base: float = 100.0) -> BarWindow:
+    ts = 60 * np.arange(start, start + count, dtype=np.int64)
+    close = base + np.arange(count, dtype=np.float64)
+    return BarWindow(ts=ts, open=close, high=close, low=close, close=close, volume=close)
+
+
+def test_bar_store_appends_and_slices_memory_mapped_windows(tmp_path: Path) -> None:
+    store = BarStore(tmp_path)
+    assert store.append("BTCUSD", "1m", make_window(0, 10)) == 10
+    assert store.append("BTCUSD", "1m", make_window(5, 10)) == 5
+    assert store.meta("BTCUSD", "1m") == {"rows": 15, "start": 0, "end": 840}
+
+    window = store.window("BTCUSD", "1m", start=120, end=300)
+    assert window.ts.tolist() == [120, 180, 240]
+    assert isinstance(window.close, np.memmap)
+    assert store.tail("BTCUSD", "1m", 2).bar(-1) == Bar(840, 109.0, 109.0, 109.0, 109.0, 109.0)
+    assert len(store.window("ETHUSD", "1m")) == 0
+
+    with pytest.raises(ValueError):
+        store.append("BTCUSD", "1m", make_window(20, 3)[::-1])
+
+
+def test_bar_store_load_aligns_symbols(tmp_path: Path) -> None:
+    store = BarStore(tmp_path)
+    store.append("BTCUSD", "1m", make_window(0, 5))
+    store.append("ETHUSD", "1m", make_window(2, 5, base=10.0))
+    data = store.load(["BTCUSD", "ETHUSD"], "1m")
+    assert data.timestamps.tolist() == [120, 180, 240]
+    assert data.close.tolist() == [[102.0, 10.0], [103.0, 11.0], [104.0, 12.0]]
+
+    store.append("SOLUSD", "1m", make_window(0, 3))
+    store.append("SOLUSD", "1m", make_window(4, 2))
+    gapped = store.load(["BTCUSD", "SOLUSD"], "1m")
+    assert gapped.timestamps.tolist() == [0, 60, 120, 240]
+    assert gapped.close[:, 1].tolist() == [100.0, 101.0, 102.0, 100.0]
+
+
+def test_bar_store_load_slices_memmaps_when_aligned(tmp_path: Path) -> None:
+    store = BarStore(tmp_path)
+    store.append("BTCUSD", "1m", make_window(0, 10))
+    data = store.load(["BTCUSD"], "1m", start=120, end=300)
+    assert data.close.shape == (3, 1)
+    assert np.shares_memory(data.close, store.window("BTCUSD", "1m").close)
+    assert np.shares_memory(data.timestamps, store.window("BTCUSD", "1m").ts)
+
+
+def test_runner_market_data_uses_stored_history(tmp_path: Path) -> None:
+    store = BarStore(tmp_path)
+    store.append("BTCUSD", "1m", make_window(0, 10))
+    strategy = MomentumStrategy(["BTCUSD", "ETHUSD"], lookback=4)
+    snapshot = MarketSnapshot.build({"BTCUSD": 120.0, "ETHUSD": 3000.0})
+    market_data = market_data_for(strategy, snapshot, store)
+    assert market_data["BTCUSD"] == [107.0, 108.0, 109.0, 120.0]
+    assert market_data["ETHUSD"] == [2970.0, 3000.0]
+
+
+def test_runner_feeds_only_new_completed_bars_to_cached_strategies(tmp_path: Path) -> None:
+    runner = StrategyRunner(BrokerMock())
+    runner.bars = BarStore(tmp_path)
+    for symbol in ("BTCUSD", "ETHUSD"):
+        runner.bars.append(symbol, "1m", make_window(0, 10))
+    runner.run_once()
+    momentum = runner.enabled_strategies()[0][1]
+    assert momentum.last_bar_ts("BTCUSD") == 540
+    assert momentum.last_targets == {"BTCUSD": 0.1, "ETHUSD": 0.1}
+
+    fed: list[tuple[str, int]] = []
+    on_bar = momentum.on_bar
+    momentum.on_bar = lambda symbol, bar: fed.append((symbol, bar.ts)) or on_bar(symbol, bar)
+    runner.bars.append("BTCUSD", "1m", make_window(10, 2))
+    runner.run_once()
+    assert fed == [("BTCUSD", 600), ("BTCUSD", 660)]
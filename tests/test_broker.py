@@ -1,4 +1,16 @@
-from app.broker import BrokerMock
+import httpx
+import pytest
+
+from app.broker import AlpacaCryptoBroker, BrokerMock, DuplicateClientOrderId
+from app.config import settings
+from app.metrics import BROKER_REQUEST_SECONDS
+
+
+@pytest.fixture()
+def alpaca_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "alpaca_api_key", "key")
+    monkeypatch.setattr(settings, "alpaca_secret_key", "secret")
+    monkeypatch.setattr(settings, "alpaca_base_url", "https://alpaca.test")
 
 
 def test_broker_mock_order_changes_position() -> None:
@@ -7,3 +19,72 @@ def test_broker_mock_order_changes_position() -> None:
     positions = broker.get_positions()
     assert positions[0]["symbol"] == "BTCUSD"
     assert positions[0]["qty"] == 1.0
+
+
+def test_alpaca_broker_reuses_one_pooled_client(alpaca_settings: None) -> None:
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers["APCA-API-KEY-ID"])
+        return httpx.Response(200, json={"equity": "1000", "cash": "500"})
+
+    broker = AlpacaCryptoBroker()
+    broker.client.close()
+    broker.client = httpx.Client(
+        base_url=broker.base_url,
+        headers=broker.headers,
+        transport=httpx.MockTransport(handler),
+    )
+    client = broker.client
+    assert broker.get_account().equity == 1000.0
+    assert broker.get_account().cash == 500.0
+    assert broker.client is client
+    assert seen == ["key", "key"]
+    broker.close()
+    assert client.is_closed
+
+
+def test_alpaca_latest_prices_batches_symbols(alpaca_settings: None) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        quotes = {"BTCUSD": {"bp": 50000}, "ETHUSD": {"bp": 3000}}
+        return httpx.Response(200, json={"quotes": quotes})
+
+    broker = AlpacaCryptoBroker(
+        client=httpx.Client(base_url="https://alpaca.test", transport=httpx.MockTransport(handler))
+    )
+    prices = broker.get_latest_prices(["BTCUSD", "ETHUSD", "SOLUSD"])
+    assert prices == {"BTCUSD": 50000.0, "ETHUSD": 3000.0}
+    assert len(requests) == 1
+    assert requests[0].url.params["symbols"] == "BTCUSD,ETHUSD,SOLUSD"
+
+
+def test_alpaca_duplicate_client_order_id_is_looked_up(alpaca_settings: None) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(422, json={"message": "client_order_id must be unique"})
+        assert request.url.params["client_order_id"] == "kf-1-BTCUSD"
+        return httpx.Response(200, json={"id": "abc", "side": "buy", "qty": "0.5"})
+
+    broker = AlpacaCryptoBroker(
+        client=httpx.Client(base_url="https://alpaca.test", transport=httpx.MockTransport(handler))
+    )
+    with pytest.raises(DuplicateClientOrderId):
+        broker.place_order("BTCUSD", "buy", 0.5, "market", client_order_id="kf-1-BTCUSD")
+    assert broker.get_order_by_client_id("kf-1-BTCUSD")["id"] == "abc"  # type: ignore[index]
+
+
+def test_alpaca_requests_are_timed_by_endpoint_and_status(alpaca_settings: None) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404, json={"message": "not found"})
+
+    broker = AlpacaCryptoBroker(
+        client=httpx.Client(base_url="https://alpaca.test", transport=httpx.MockTransport(handler))
+    )
+    labels = {"method": "DELETE", "endpoint": "/v2/orders/{id}", "status": "404"}
+    before = BROKER_REQUEST_SECONDS.count(**labels)
+    with pytest.raises(httpx.HTTPStatusError):
+        broker.cancel_order("abc")
+    assert BROKER_REQUEST_SECONDS.count(**labels) == before + 1
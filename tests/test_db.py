@@ -0,0 +1,64 @@
+import json
+import threading
+
+import pytest
+
+from app import db
+
+
+def test_get_conn_reuses_thread_connection_in_wal_mode() -> None:
+    with db.get_conn() as first:
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert first.execute("PRAGMA synchronous").fetchone()[0] == 1
+    with db.get_conn() as second:
+        assert second is first
+
+    other: list[object] = []
+    thread = threading.Thread(target=lambda: other.append(db._thread_conn()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_get_conn_rolls_back_on_error() -> None:
+    with pytest.raises(RuntimeError), db.get_conn() as conn:
+        conn.execute(
+            "INSERT INTO config_state(key, value, updated_at) VALUES ('scratch', 'x', 'now')"
+        )
+        raise RuntimeError("boom")
+    assert db.get_state("scratch", "missing") == "missing"
+
+
+def test_state_store_sees_writes_from_other_connections() -> None:
+    assert db.state.get_bool("kill_switch") is False
+    with db.get_conn() as conn:
+        conn.execute("UPDATE config_state SET value = 'true' WHERE key = 'kill_switch'")
+    assert db.state.get_bool("kill_switch") is True
+    db.state.set_bool("kill_switch", False)
+    assert db.get_state("kill_switch") == "false"
+
+
+def test_state_store_serves_warm_reads_from_memory() -> None:
+    db.state.get("peak_equity")
+    statements: list[str] = []
+    db.state._conn.set_trace_callback(statements.append)  # type: ignore[union-attr]
+    assert db.state.get_float("peak_equity", 0.0) == 100000.0
+    assert db.state.get_bool("armed_live") is False
+    assert statements == ["PRAGMA data_version", "PRAGMA data_version"]
+
+
+def test_history_pages_by_id_and_projects_without_blobs() -> None:
+    for i in range(5):
+        db.insert_run("ok" if i % 2 else "partial", f"run {i}", {"i": i})
+    first = db.list_history("runs", limit=2, filters={"status": "partial"}, fields=["status"])
+    assert first == [{"id": 5, "status": "partial"}, {"id": 3, "status": "partial"}]
+    rest = db.list_history("runs", limit=2, before_id=3, filters={"status": "partial"})
+    assert [r["details"] for r in rest] == [{"i": 0}]
+    with pytest.raises(ValueError):
+        db.list_history("runs", fields=["password"])
+
+
+def test_history_ndjson_splices_raw_blobs() -> None:
+    db.insert_risk_event("block", "kill_switch", {"nested": [1, 2]})
+    lines = b"".join(db.iter_history_ndjson("risk_events")).decode().splitlines()
+    assert json.loads(lines[0])["context"] == {"nested": [1, 2]}
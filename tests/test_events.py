@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from app import db
+from app.broker import BrokerMock
+from app.events import EventBus, bus
+from app.runner import StrategyRunner
+
+
+def test_event_is_encoded_once_as_sse_frame() -> None:
+    event = EventBus().publish("run", {"id": 1, "status": "ok"})
+    assert event.encoded == b'id: 1\nevent: run\ndata: {"id":1,"status":"ok"}\n\n'
+
+
+def test_bus_fans_out_thread_published_events_to_every_subscriber() -> None:
+    events = EventBus()
+
+    async def scenario() -> list[list[bytes]]:
+        subscriptions = [events.subscribe() for _ in range(3)]
+        streams = [s.stream(heartbeat_seconds=5) for s in subscriptions]
+        for stream in streams:
+            assert await anext(stream) == b"retry: 3000\n\n"
+        thread = threading.Thread(target=events.publish, args=("state", {"equity": 1.0}))
+        thread.start()
+        thread.join()
+        received = [[await anext(stream)] for stream in streams]
+        for stream in streams:
+            await stream.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+    assert all(chunks[0].startswith(b"id: 1\nevent: state\n") for chunks in received)
+    assert events.subscriber_count == 0
+
+
+def test_subscribe_replays_events_after_last_event_id() -> None:
+    events = EventBus()
+    for i in range(3):
+        events.publish("run", {"id": i})
+
+    async def scenario() -> list[int]:
+        subscription = events.subscribe("1")
+        return [subscription.queue.get_nowait().id for _ in range(subscription.queue.qsize())]
+
+    assert asyncio.run(scenario()) == [2, 3]
+
+
+def test_run_once_publishes_run_and_order_events() -> None:
+    last_id = bus.publish("test", {}).id
+    StrategyRunner(BrokerMock()).run_once()
+    published = [e.type for e in bus.recent() if e.id > last_id]
+    assert published[-1] == "run"
+    run = bus.recent()[-1].data
+    assert run["details"] == db.list_runs(1)[0]["details"]
+    assert "order" in published
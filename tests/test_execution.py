@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+
+from app import db
+from app.broker import AsyncBrokerMock, BrokerMock
+from app.execution import OrderExecutor, client_order_id
+from app.runner import StrategyRunner
+
+
+class FlakyBroker(BrokerMock):
+    def __init__(self, latency: float = 0.0, lost_responses: int = 0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.lost_responses = lost_responses
+        self.calls = 0
+
+    def place_order(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        self.calls += 1
+        time.sleep(self.latency)
+        order = super().place_order(*args, **kwargs)
+        if self.lost_responses:
+            self.lost_responses -= 1
+            raise httpx.ReadTimeout("response lost")
+        return order
+
+
+def _decisions(symbols: list[str]) -> list[dict[str, Any]]:
+    return [
+        {"symbol": s, "side": "buy", "qty": 1.0, "status": "approved", "strategies": {"m:1": 0.1}}
+        for s in symbols
+    ]
+
+
+def test_submit_places_orders_concurrently() -> None:
+    broker = FlakyBroker(latency=0.1)
+    executor = OrderExecutor(broker, AsyncBrokerMock(broker), max_concurrency=8)
+    decisions = _decisions(["BTCUSD", "ETHUSD", "SOLUSD", "LTCUSD"])
+    started = time.perf_counter()
+    executor.submit(7, decisions)
+    assert time.perf_counter() - started < 0.3
+    assert all(d["status"] == "submitted" for d in decisions)
+    assert decisions[0]["client_order_id"] == client_order_id(7, ["m:1"], "BTCUSD")
+    executor.close()
+
+
+def test_retry_after_lost_response_does_not_double_fill() -> None:
+    broker = FlakyBroker(lost_responses=1)
+    executor = OrderExecutor(broker, AsyncBrokerMock(broker), backoff_seconds=0.0)
+    decisions = _decisions(["BTCUSD"])
+    executor.submit(1, decisions)
+    assert broker.calls == 2
+    assert broker.positions == {"BTCUSD": 1.0}
+    assert decisions[0]["status"] == "submitted"
+    executor.close()
+
+
+def test_last_ambiguous_failure_returns_the_accepted_order() -> None:
+    broker = FlakyBroker(lost_responses=5)
+    executor = OrderExecutor(broker, AsyncBrokerMock(broker), max_retries=0)
+    decisions = _decisions(["BTCUSD"])
+    executor.submit(1, decisions)
+    assert broker.calls == 1
+    assert decisions[0]["status"] == "submitted"
+    assert decisions[0]["order_id"] == broker.orders[decisions[0]["client_order_id"]]["id"]
+
+    class TimingOutBroker(AsyncBrokerMock):
+        async def place_order(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+            await super().place_order(*args, **kwargs)
+            raise httpx.ReadTimeout("response lost")
+
+    async_decisions = _decisions(["ETHUSD"])
+    executor = OrderExecutor(broker, TimingOutBroker(broker), max_retries=0)
+    asyncio.run(executor.submit_async(2, async_decisions))
+    assert async_decisions[0]["status"] == "submitted"
+    assert broker.positions == {"BTCUSD": 1.0, "ETHUSD": 1.0}
+    executor.close()
+
+
+def test_async_submit_marks_non_retryable_errors_failed() -> None:
+    class RejectingBroker(AsyncBrokerMock):
+        async def place_order(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+            request = httpx.Request("POST", "https://alpaca.test/v2/orders")
+            response = httpx.Response(403, request=request)
+            raise httpx.HTTPStatusError("forbidden", request=request, response=response)
+
+    broker = BrokerMock()
+    executor = OrderExecutor(broker, RejectingBroker(broker), backoff_seconds=0.0)
+    decisions = _decisions(["BTCUSD"])
+    asyncio.run(executor.submit_async(1, decisions))
+    assert decisions[0]["status"] == "failed"
+    assert "HTTPStatusError" in decisions[0]["reasons"][0]
+
+
+def test_run_once_records_broker_side_and_qty() -> None:
+    broker = BrokerMock()
+    broker.positions["BTCUSD"] = 1.0
+    runner = StrategyRunner(broker)
+    runner.risk.per_trade_risk = 1.0
+    result = runner.run_once()
+    orders = {o["symbol"]: o for o in db.list_orders()}
+    assert orders["BTCUSD"]["side"] == "sell"
+    assert round(orders["BTCUSD"]["qty"], 9) == 0.8
+    assert orders["BTCUSD"]["client_order_id"].startswith(f"kf-{result['run_id']}-BTCUSD-")
+    assert orders["BTCUSD"]["broker_status"] == "accepted"
+    runner.close()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from app.bars import Bar
+from app.indicators import EMA, SMA, Returns, RollingMax, RollingMin, RollingVariance, ZScore
+from app.strategies import MeanReversionStrategy, MomentumStrategy
+
+
+def test_rolling_indicators_match_full_window_recomputation() -> None:
+    values = np.random.default_rng(11).normal(100, 5, 200)
+    window = 7
+    sma, var, z = SMA(window), RollingVariance(window), ZScore(window)
+    high, low, ret = RollingMax(window), RollingMin(window), Returns(window - 1)
+    for t, x in enumerate(values):
+        recent = values[max(0, t - window + 1) : t + 1]
+        assert sma.update(x) == pytest.approx(recent.mean())
+        expected_var = recent.var(ddof=1) if len(recent) > 1 else 0.0
+        assert var.update(x) == pytest.approx(expected_var)
+        expected_z = (x - recent.mean()) / np.sqrt(expected_var) if expected_var else 0.0
+        assert z.update(x) == pytest.approx(expected_z)
+        assert high.update(x) == recent.max()
+        assert low.update(x) == recent.min()
+        assert ret.update(x) == pytest.approx(x / recent[0] - 1)
+    assert sma.ready and z.ready and high.ready
+
+
+def test_ema_seeds_with_first_value() -> None:
+    ema = EMA(span=3)
+    assert ema.update(10.0) == 10.0
+    assert ema.update(20.0) == pytest.approx(15.0)
+
+
+def test_strategy_on_bar_matches_batch_targets() -> None:
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(5).normal(0, 0.02, 150)))
+    for strategy in (
+        MomentumStrategy(["BTCUSD"], lookback=6),
+        MeanReversionStrategy(["BTCUSD"], lookback=6, threshold=0.01),
+    ):
+        for t, close in enumerate(closes):
+            bar = Bar(ts=60 * t, open=close, high=close, low=close, close=close, volume=1.0)
+            window = closes[max(0, t - 5) : t + 1].tolist()
+            expected = strategy.generate_targets({"BTCUSD": window})["BTCUSD"]
+            assert strategy.on_bar("BTCUSD", bar) == expected
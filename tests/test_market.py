@@ -0,0 +1,41 @@
+import httpx
+import pytest
+
+from app.broker import BrokerMock
+from app.market import MarketSnapshotCache
+
+
+class FlakyBroker(BrokerMock):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+        self.fail = False
+
+    def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        self.calls += 1
+        if self.fail:
+            raise httpx.ConnectError("down")
+        return super().get_latest_prices(symbols)
+
+
+def test_snapshot_cache_reuses_within_ttl() -> None:
+    broker = FlakyBroker()
+    cache = MarketSnapshotCache(ttl_seconds=60)
+    first = cache.get(broker, ["BTCUSD"])
+    second = cache.get(broker, ["BTCUSD"])
+    assert first is second
+    assert broker.calls == 1
+    with pytest.raises(TypeError):
+        first.prices["BTCUSD"] = 1.0  # type: ignore[index]
+
+
+def test_snapshot_refresh_failure_serves_stale_copy() -> None:
+    broker = FlakyBroker()
+    cache = MarketSnapshotCache(ttl_seconds=60)
+    fresh = cache.refresh(broker, ["BTCUSD"])
+    broker.fail = True
+    stale = cache.refresh(broker, ["BTCUSD"])
+    assert stale.stale and not fresh.stale
+    assert stale.prices == fresh.prices
+    with pytest.raises(httpx.ConnectError):
+        cache.refresh(broker, ["SOLUSD"])
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+from app import db
+from app.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = Registry()
+    latency = registry.histogram("req_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1.0))
+    latency.observe(0.05, endpoint="/v2/account")
+    latency.observe(0.5, endpoint="/v2/account")
+    latency.observe(5.0, endpoint="/v2/account")
+    lines = registry.render().splitlines()
+    assert "# TYPE req_seconds histogram" in lines
+    assert 'req_seconds_bucket{endpoint="/v2/account",le="0.1"} 1' in lines
+    assert 'req_seconds_bucket{endpoint="/v2/account",le="1"} 2' in lines
+    assert 'req_seconds_bucket{endpoint="/v2/account",le="+Inf"} 3' in lines
+    assert 'req_seconds_count{endpoint="/v2/account"} 3' in lines
+
+
+def test_run_once_exposes_phase_timings(client: TestClient) -> None:
+    run = client.post("/api/run_once").json()
+    body = client.get("/metrics").text
+    assert 'kudan_cycle_phase_seconds_count{phase="strategies"}' in body
+    assert 'kudan_cycles_total{status="' in body
+    details = next(r for r in db.list_runs() if r["id"] == run["run_id"])["details"]
+    assert {"fetch", "strategies", "risk", "orders", "total"} <= set(details["timings_ms"])
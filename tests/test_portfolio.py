@@ -0,0 +1,42 @@
+from app.broker import BrokerMock
+from app.portfolio import net_targets, order_intents
+from app.runner import StrategyRunner
+from app.strategies import build_strategy
+
+
+def _strategies() -> list:
+    return [
+        ({"id": 1, "name": "momentum", "mode": "paper"}, build_strategy("momentum", {})),
+        (
+            {"id": 2, "name": "mean_reversion", "mode": "live"},
+            build_strategy("mean_reversion", {"allocation": 0.5}),
+        ),
+    ]
+
+
+def test_net_targets_combines_weighted_strategy_targets() -> None:
+    netted = net_targets(_strategies(), [{"BTCUSD": 0.1}, {"BTCUSD": -0.08, "ETHUSD": 0.08}])
+    assert netted["BTCUSD"].weight == 0.1 - 0.04
+    assert netted["BTCUSD"].attribution == {"momentum:1": 0.1, "mean_reversion:2": -0.04}
+    assert netted["BTCUSD"].live
+    assert netted["ETHUSD"].weight == 0.04
+
+
+def test_order_intents_skip_trades_inside_band() -> None:
+    netted = net_targets(_strategies(), [{"BTCUSD": 0.1, "ETHUSD": 0.1}, {}])
+    pos_map = {"BTCUSD": 0.1999, "ETHUSD": 1.0}
+    prices = {"BTCUSD": 50000.0, "ETHUSD": 3000.0}
+    intents = order_intents(netted, prices, 100000.0, pos_map, min_notional=1.0, band=0.001)
+    assert [(i.symbol, i.side) for i in intents] == [("ETHUSD", "buy")]
+    assert round(intents[0].qty, 6) == round(10000 / 3000 - 1.0, 6)
+
+
+def test_run_once_emits_one_order_per_symbol() -> None:
+    runner = StrategyRunner(BrokerMock())
+    runner.risk.per_trade_risk = 1.0
+    result = runner.run_once()
+    symbols = [d["symbol"] for d in result["decisions"]]
+    assert sorted(symbols) == ["BTCUSD", "ETHUSD"]
+    assert all(
+        set(d["strategies"]) == {"momentum:1", "mean_reversion:2"} for d in result["decisions"]
+    )
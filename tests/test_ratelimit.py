@@ -0,0 +1,27 @@
+from app import db
+from app.ratelimit import OrderRateLimiter, SlidingWindowCounter
+
+
+def test_sliding_window_counter_evicts_old_events() -> None:
+    now = [1000.0]
+    counter = SlidingWindowCounter(window_seconds=60, clock=lambda: now[0])
+    counter.record()
+    now[0] += 30
+    counter.record()
+    assert counter.count() == 2
+    now[0] += 31
+    assert counter.count() == 1
+
+
+def test_order_rate_limiter_rebuilds_from_submitted_orders() -> None:
+    db.insert_order(1, "BTCUSD", "buy", 1.0, "submitted", "a")
+    db.insert_order(1, "ETHUSD", "buy", 0.0, "risk_block", None, "per_trade_risk_exceeded")
+    with db.get_conn() as conn:
+        conn.execute(
+            "INSERT INTO orders(run_id, created_at, symbol, side, qty, status) "
+            "VALUES (1, '2000-01-01T00:00:00+00:00', 'BTCUSD', 'buy', 1.0, 'submitted')"
+        )
+    limiter = OrderRateLimiter()
+    limiter.rebuild()
+    assert limiter.count() == 1
+    assert db.orders_in_last_hour() == 1
@@ -0,0 +1,59 @@
+from datetime import UTC, datetime
+from pathlib import Path
+
+from app import db
+from app.retention import enable_incremental_vacuum, iter_archive, list_rollups, run_retention
+
+NOW = datetime(2026, 3, 20, 12, 30, tzinfo=UTC)
+
+
+def _seed(created_at: str, status: str = "submitted") -> None:
+    db.insert_audit_batch(
+        (created_at, "ok", "Cycle", {"decisions": [{"symbol": "BTCUSD"}]}),
+        [
+            (created_at, "BTCUSD", "buy", 0.1, status, "x", None, "kf", "accepted", 5000.0),
+            (
+                created_at,
+                "BTCUSD",
+                "sell",
+                0.1,
+                "risk_block",
+                None,
+                "kill_switch",
+                None,
+                None,
+                5000.0,
+            ),
+        ],
+        [(created_at, "block", "kill_switch", {"equity": 1.0})],
+    )
+
+
+def test_retention_rolls_up_and_archives_old_rows(tmp_path: Path) -> None:
+    _seed("2026-03-01T10:05:00+00:00")
+    _seed("2026-03-01T10:45:00+00:00")
+    _seed("2026-03-19T09:00:00+00:00")
+    result = run_retention(now=NOW, raw_days=7, archive_dir=tmp_path)
+
+    assert result["archived"]["orders"]["rows"] == 4
+    assert [r["created_at"][:10] for r in db.list_orders()] == ["2026-03-19"] * 2
+    hourly = {(r["status"], r["reason"]): r for r in list_rollups("orders", "hour")}
+    assert hourly[("submitted", "")]["orders"] == 2
+    assert hourly[("risk_block", "kill_switch")]["notional"] == 10000.0
+    assert list_rollups("runs", "day")[0] == {
+        "granularity": "day",
+        "bucket": "2026-03-01",
+        "status": "ok",
+        "runs": 2,
+    }
+
+    archived = list(iter_archive("runs", since="2026-03-01T10:30:00+00:00"))
+    assert [r["details"] for r in archived] == [{"decisions": [{"symbol": "BTCUSD"}]}]
+    assert run_retention(now=NOW, raw_days=7, archive_dir=tmp_path)["archived"]["runs"] is None
+
+
+def test_new_databases_start_with_incremental_auto_vacuum() -> None:
+    with db.get_conn() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert enable_incremental_vacuum() is False
@@ -1,4 +1,6 @@
 from app import db
+from app.broker import Account
+from app.portfolio import NetTarget, OrderIntent
 from app.risk import RiskGovernor, ensure_live_gate
 
 
@@ -19,3 +21,47 @@ def test_live_gate_needs_arming() -> None:
     decision = ensure_live_gate()
     assert not decision.allowed
     assert any("not armed" in reason.lower() for reason in decision.reasons)
+
+
+def _intent(symbol: str, side: str, notional: float) -> OrderIntent:
+    return OrderIntent(symbol, side, notional / 100.0, 100.0, NetTarget(symbol))
+
+
+def test_evaluate_orders_accumulates_exposure_across_basket() -> None:
+    gov = RiskGovernor()
+    gov.per_trade_risk = 1.0
+    gov.max_gross_exposure = 0.5
+    positions = [{"symbol": "BTCUSD", "qty": 300.0, "market_value": 30000.0}]
+    orders = [
+        _intent("ETHUSD", "buy", 15000),
+        _intent("SOLUSD", "buy", 30000),
+        _intent("BTCUSD", "sell", 20000),
+    ]
+    decisions = gov.evaluate_orders(Account(equity=100000, cash=50000), positions, orders)
+    assert [d.allowed for d in decisions] == [True, False, True]
+    assert decisions[1].reasons == ["max_gross_exposure_exceeded"]
+    events = db.list_risk_events()
+    assert len(events) == 1
+    assert [o["symbol"] for o in events[0]["context"]["orders"]] == ["SOLUSD"]
+
+
+def test_evaluate_orders_applies_offsetting_sells_before_buys_at_the_cap() -> None:
+    gov = RiskGovernor()
+    gov.per_trade_risk = 1.0
+    gov.max_gross_exposure = 0.5
+    positions = [{"symbol": "BTCUSD", "qty": 500.0, "market_value": 50000.0}]
+    orders = [_intent("ETHUSD", "buy", 20000), _intent("BTCUSD", "sell", 20000)]
+    decisions = gov.evaluate_orders(Account(equity=100000, cash=50000), positions, orders)
+    assert [d.allowed for d in decisions] == [True, True]
+    assert db.list_risk_events() == []
+
+
+def test_evaluate_orders_counts_approved_orders_against_hourly_limit() -> None:
+    gov = RiskGovernor()
+    gov.max_orders_per_hour = 2
+    orders = [_intent(symbol, "buy", 100) for symbol in ("BTCUSD", "ETHUSD", "SOLUSD")]
+    decisions = gov.evaluate_orders(
+        Account(equity=100000, cash=100000), [], orders, orders_last_hour=1
+    )
+    assert [d.allowed for d in decisions] == [True, False, False]
+    assert db.list_risk_events()[0]["reason"] == "max_orders_per_hour_exceeded"
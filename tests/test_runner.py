@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from typing import Any
+
+import httpx
+import pytest
+
+from app import db
+from app import runner as runner_module
+from app.broker import AsyncBrokerMock, BrokerMock
+from app.config import settings
+from app.runner import Scheduler, StrategyRunner, crossed_boundaries, next_boundary
+
+
+class CountingBroker(BrokerMock):
+    def __init__(self) -> None:
+        super().__init__()
+        self.quote_calls: list[list[str]] = []
+
+    def get_latest_price(self, symbol: str) -> float:
+        raise AssertionError("runner should use batched quotes")
+
+    def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        self.quote_calls.append(list(symbols))
+        return super().get_latest_prices(symbols)
+
+
+def test_run_once_fetches_union_of_universes_once() -> None:
+    broker = CountingBroker()
+    result = StrategyRunner(broker).run_once()
+    assert broker.quote_calls == [["BTCUSD", "ETHUSD"]]
+    assert result["decisions"]
+
+
+def test_run_once_blocks_orders_on_stale_snapshot() -> None:
+    runner = StrategyRunner(BrokerMock())
+    runner.run_once()
+    runner.broker.get_latest_prices = _raise_http_error  # type: ignore[method-assign]
+    result = runner.run_once()
+    assert result["decisions"]
+    assert all(d["reasons"] == ["stale_market_data"] for d in result["decisions"])
+
+
+def _raise_http_error(symbols: list[str]) -> dict[str, float]:
+    raise httpx.ReadTimeout("quotes timed out")
+
+
+def test_run_once_async_overlaps_broker_calls() -> None:
+    mock = BrokerMock()
+    runner = StrategyRunner(mock, AsyncBrokerMock(mock, latency=0.1))
+    runner.risk.per_trade_risk = 1.0
+    started = time.perf_counter()
+    result = asyncio.run(runner.run_once_async())
+    elapsed = time.perf_counter() - started
+    assert elapsed < 0.35
+    assert [d["status"] for d in result["decisions"]] == ["submitted", "submitted"]
+    assert {p["symbol"] for p in mock.get_positions()} == {"BTCUSD", "ETHUSD"}
+
+
+def test_run_once_async_keeps_sqlite_off_the_event_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    threads: set[int] = set()
+    get_conn, connection = db.get_conn, db.StateStore._connection
+
+    def tracked_get_conn() -> Any:
+        threads.add(threading.get_ident())
+        return get_conn()
+
+    def tracked_connection(self: db.StateStore) -> Any:
+        threads.add(threading.get_ident())
+        return connection(self)
+
+    monkeypatch.setattr(db, "get_conn", tracked_get_conn)
+    monkeypatch.setattr(db.StateStore, "_connection", tracked_connection)
+    mock = BrokerMock()
+    runner = StrategyRunner(mock, AsyncBrokerMock(mock))
+    runner.risk.per_trade_risk = 1.0
+    result = asyncio.run(runner.run_once_async())
+    assert result["run_id"] is not None
+    assert threads and threading.get_ident() not in threads
+
+
+def test_scheduler_keeps_the_retention_schedule_across_restarts(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[int] = []
+    monkeypatch.setattr(runner_module, "run_retention", lambda: calls.append(1) or {"archived": {}})
+    runner = StrategyRunner(BrokerMock())
+    interval = settings.retention_interval_hours * 3600
+    Scheduler(runner).maybe_run_retention(1000.0)
+    restarted = Scheduler(runner)
+    restarted.maybe_run_retention(1000.0 + interval - 1)
+    assert restarted._retention is None
+    restarted = Scheduler(runner)
+    restarted.maybe_run_retention(1000.0 + interval)
+    assert restarted._retention is not None
+    restarted._retention.join()
+    assert calls == [1]
+    assert db.state.get_float("retention_next_at", 0.0) == 1000.0 + 2 * interval
+
+
+def test_scheduler_boundaries_are_wall_clock_aligned() -> None:
+    assert next_boundary(3599.2, [60, 300, 3600]) == 3600
+    assert next_boundary(3600.0, [300]) == 3900
+    assert crossed_boundaries(59.9, 60.0, 60) == 1
+    assert crossed_boundaries(60.0, 119.9, 60) == 0
+
+
+def test_scheduler_coalesces_missed_ticks_into_one_run() -> None:
+    class FakeRunner:
+        def __init__(self) -> None:
+            self.calls: list[set[str]] = []
+            self.published = 0
+
+        def run_once(self, timeframes: set[str]) -> None:
+            self.calls.append(timeframes)
+            raise RuntimeError("boom")
+
+        def publish_state(self) -> None:
+            self.published += 1
+
+    runner = FakeRunner()
+    scheduler = Scheduler(runner)  # type: ignore[arg-type]
+    periods = {"1m": 60, "5m": 300, "1h": 3600}
+    assert scheduler.tick(3540.0, 3600.0, periods) == {"1m", "5m", "1h"}
+    assert scheduler.tick(3600.0, 3910.0, periods) == {"1m", "5m"}
+    assert runner.calls == [{"1m", "5m", "1h"}, {"1m", "5m"}]
+    assert scheduler.errors == 2
+    assert runner.published == 2
+    assert scheduler.overruns[0]["coalesced"] == {"1m": 4}
+
+
+def test_scheduler_skips_only_strategies_with_an_invalid_timeframe() -> None:
+    with db.get_conn() as conn:
+        conn.execute(
+            "UPDATE strategies SET config = ? WHERE name = 'mean_reversion'",
+            ('{"symbols": ["BTCUSD"], "timeframe": "5x"}',),
+        )
+    runner = StrategyRunner(BrokerMock())
+    scheduler = Scheduler(runner)
+    assert scheduler.periods() == {"1m": 60}
+    assert [row["name"] for row, _ in runner.enabled_strategies()] == ["momentum"]
+    strategies = runner.enabled_strategies()
+    assert runner._due(strategies, set(scheduler.periods())) == strategies
+
+
+def test_run_once_reuses_targets_of_strategies_not_due() -> None:
+    runner = StrategyRunner(BrokerMock())
+    runner.run_once()
+    strategies = runner.enabled_strategies()
+    strategies[1][1].last_targets = {"BTCUSD": 0.05}
+    result = runner.run_once({"5m"})
+    targets = {d["symbol"]: d["target_weight"] for d in result["decisions"]}
+    assert targets["BTCUSD"] == 0.1 + 0.05
+
+
+def test_run_once_blocks_netted_symbols_without_a_price() -> None:
+    class PartialQuotes(BrokerMock):
+        drop = False
+
+        def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+            prices = super().get_latest_prices(symbols)
+            if self.drop:
+                prices.pop("ETHUSD")
+            return prices
+
+    broker = PartialQuotes()
+    runner = StrategyRunner(broker)
+    runner.run_once()
+    runner.enabled_strategies()[1][1].last_targets = {"ETHUSD": 0.05}
+    broker.drop = True
+    result = runner.run_once({"5m"})
+    blocked = [d for d in result["decisions"] if d["symbol"] == "ETHUSD"]
+    assert [(d["status"], d["reasons"]) for d in blocked] == [("blocked", ["missing_price"])]
@@ -1,7 +1,73 @@
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 
+from app.broker import Account
+from app.main import runner
+
 
 def test_healthz(client: TestClient) -> None:
     response = client.get("/healthz")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
+
+
+def test_api_state_includes_market_snapshot(client: TestClient) -> None:
+    body = client.get("/api/state").json()
+    assert body["prices"]["BTCUSD"] == 50000.0
+    assert body["prices_stale"] is False
+
+
+def test_api_run_once_records_run(client: TestClient) -> None:
+    response = client.post("/api/run_once")
+    assert response.status_code == 200
+    assert response.json()["run_id"] >= 1
+
+
+def test_api_state_serves_cached_snapshot_with_etag(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[Account] = []
+    get_account = runner.broker.get_account
+    monkeypatch.setattr(
+        runner.broker, "get_account", lambda: calls.append(get_account()) or calls[-1]
+    )
+    runner.states.invalidate()
+    first = client.get("/api/state")
+    assert first.json()["as_of"]
+    assert client.get("/").status_code == 200
+    cached = client.get("/api/state", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+    assert len(calls) == 1
+
+
+def test_api_state_falls_back_to_stale_snapshot_after_invalidate(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fresh = client.get("/api/state")
+    client.post("/api/kill_switch/enable")
+
+    def outage() -> Account:
+        raise httpx.ConnectError("broker down")
+
+    monkeypatch.setattr(runner.broker, "get_account", outage)
+    stale = client.get("/api/state", headers={"If-None-Match": fresh.headers["ETag"]})
+    assert stale.status_code == 200
+    assert stale.json()["stale"] is True
+    assert stale.headers["ETag"] != fresh.headers["ETag"]
+    assert client.get("/").status_code == 200
+
+
+def test_api_orders_filters_and_streams_ndjson(client: TestClient) -> None:
+    runner.risk.per_trade_risk = 1.0
+    try:
+        client.post("/api/run_once")
+    finally:
+        runner.risk.per_trade_risk = 0.0025
+    page = client.get("/api/orders", params={"symbol": "BTCUSD", "fields": "symbol,side"}).json()
+    assert page["items"] == [{"id": page["items"][0]["id"], "symbol": "BTCUSD", "side": "buy"}]
+    assert page["next_before_id"] is None
+    export = client.get("/api/orders", params={"format": "ndjson"})
+    assert export.headers["content-type"] == "application/x-ndjson"
+    assert len(export.text.splitlines()) == 2
+    assert client.get("/api/runs", params={"fields": "nope"}).status_code == 400
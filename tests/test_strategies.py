@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from app import db
+from app.strategies import (
+    STRATEGIES,
+    MomentumStrategy,
+    StrategyCache,
+    build_strategy,
+    register_strategy,
+)
+
+
+def test_register_strategy_adds_buildable_plugin() -> None:
+    @register_strategy("flat_test")
+    class FlatStrategy(MomentumStrategy):
+        def generate_targets(self, market_data: dict[str, list[float]]) -> dict[str, float]:
+            return {symbol: 0.0 for symbol in self.universe}
+
+    try:
+        strategy = build_strategy("flat_test", {"symbols": ["BTCUSD"], "allocation": 0.5})
+        assert isinstance(strategy, FlatStrategy)
+        assert strategy.name == "flat_test"
+        assert strategy.allocation == 0.5
+        with pytest.raises(ValueError):
+            register_strategy("momentum")(FlatStrategy)
+    finally:
+        STRATEGIES.pop("flat_test")
+
+
+def test_strategy_cache_reuses_instances_until_config_changes() -> None:
+    cache = StrategyCache()
+    first = cache.enabled()
+    assert cache.builds == 2
+    assert [s for _, s in cache.enabled()] == [s for _, s in first]
+    assert cache.builds == 2
+
+    momentum_id, reversion_id = (row["id"] for row, _ in first)
+    db.update_strategy_mode(momentum_id, "canary")
+    with db.get_conn() as conn:
+        conn.execute(
+            "UPDATE strategies SET config = ? WHERE id = ?",
+            (json.dumps({"symbols": ["BTCUSD"], "lookback": 5}), reversion_id),
+        )
+    (row, momentum), (_, reversion) = cache.enabled()
+    assert cache.builds == 3
+    assert row["mode"] == "canary"
+    assert momentum is first[0][1]
+    assert reversion is not first[1][1] and reversion.lookback == 5
+
+    with db.get_conn() as conn:
+        conn.execute("UPDATE strategies SET enabled = 0 WHERE id = ?", (momentum_id,))
+    assert [s for _, s in cache.enabled()] == [reversion]
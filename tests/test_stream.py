@@ -0,0 +1,73 @@
+import time
+
+from app.bars import Bar
+from app.broker import BrokerMock
+from app.runner import StrategyRunner
+from app.stream import (
+    QUOTE_DTYPE,
+    BarAggregator,
+    MarketDataService,
+    QuoteEvent,
+    RingBuffer,
+    SimulatedFeed,
+    parse_alpaca_message,
+)
+
+
+def test_ring_buffer_keeps_latest_rows_in_order() -> None:
+    buffer = RingBuffer(3, QUOTE_DTYPE)
+    for i in range(5):
+        buffer.append((float(i), 100.0 + i, 101.0 + i))
+    assert len(buffer) == 3
+    assert buffer.last(10)["ts"].tolist() == [2.0, 3.0, 4.0]
+    assert float(buffer.latest()["bid"]) == 104.0
+    assert buffer.since(2.5)["ts"].tolist() == [3.0, 4.0]
+    assert len(buffer.since(4.0)) == 0
+
+
+def test_bar_aggregator_closes_bar_on_boundary() -> None:
+    aggregator = BarAggregator(60)
+    assert aggregator.update(0.0, 10.0) is None
+    assert aggregator.update(30.0, 12.0) is None
+    assert aggregator.update(59.0, 9.0) is None
+    assert aggregator.update(61.0, 11.0) == Bar(0, 10.0, 12.0, 9.0, 9.0, 3.0)
+
+
+def test_parse_alpaca_quote() -> None:
+    event = parse_alpaca_message(
+        {"T": "q", "S": "BTCUSD", "bp": 50000, "ap": 50010, "t": "2024-03-12T10:27:48.8Z"}
+    )
+    assert isinstance(event, QuoteEvent)
+    assert event.bid == 50000.0
+
+
+def test_simulated_feed_fills_buffers_in_background() -> None:
+    service = MarketDataService(SimulatedFeed(interval_seconds=0.01), ["BTCUSD", "ETHUSD"])
+    service.start()
+    try:
+        deadline = time.time() + 2
+        while time.time() < deadline and len(service.quotes["ETHUSD"]) < 5:
+            time.sleep(0.01)
+    finally:
+        service.stop()
+    prices, oldest = service.latest_prices(["BTCUSD", "ETHUSD"])
+    assert set(prices) == {"BTCUSD", "ETHUSD"}
+    assert oldest is not None
+
+
+class NoQuotesBroker(BrokerMock):
+    def get_latest_prices(self, symbols: list[str]) -> dict[str, float]:
+        raise AssertionError("runner should read streamed quotes")
+
+
+def test_runner_prefers_streamed_quotes() -> None:
+    runner = StrategyRunner(NoQuotesBroker())
+    service = MarketDataService(SimulatedFeed(), ["BTCUSD", "ETHUSD"])
+    now = time.time()
+    for symbol, price in (("BTCUSD", 51000.0), ("ETHUSD", 3100.0)):
+        service.handle(QuoteEvent(symbol, now, price, price + 1))
+    runner.stream = service
+    runner.market.stream = service
+    result = runner.run_once()
+    assert result["decisions"]
+    assert dict(runner.market.latest().prices) == {"BTCUSD": 51000.0, "ETHUSD": 3100.0}
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import numpy as np
+
+from app import db
+from app.backtest import BacktestConfig
+from app.bars import BarStore, BarWindow
+from app.sweep import expand_grid, run_sweep, sweep_heatmap, sweep_sensitivity
+
+
+def test_expand_grid_is_cartesian() -> None:
+    grid = expand_grid({"lookback": [2, 5], "weight": [0.1]})
+    assert grid == [{"lookback": 2, "weight": 0.1}, {"lookback": 5, "weight": 0.1}]
+
+
+def test_run_sweep_streams_results_and_builds_heatmap(tmp_path: Path) -> None:
+    store = BarStore(tmp_path)
+    rng = np.random.default_rng(3)
+    ts = 60 * np.arange(500, dtype=np.int64)
+    for symbol in ("BTCUSD", "ETHUSD"):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, 500)))
+        store.append(
+            symbol,
+            "1m",
+            BarWindow(ts=ts, open=close, high=close, low=close, close=close, volume=close),
+        )
+    sweep_id = run_sweep(
+        "momentum",
+        {"lookback": [2, 5, 10], "weight": [0.05, 0.1]},
+        ["BTCUSD", "ETHUSD"],
+        backtest_config=BacktestConfig(per_trade_risk=1.0, max_orders_per_hour=1000),
+        workers=2,
+        store=store,
+    )
+    assert len(db.list_sweep_results(sweep_id)) == 6
+    heatmap = sweep_heatmap(sweep_id, "lookback", "weight", "total_return")
+    assert heatmap["x_values"] == [2, 5, 10]
+    assert heatmap["y_values"] == [0.05, 0.1]
+    assert all(value is not None for row in heatmap["values"] for value in row)
+    assert sweep_sensitivity(sweep_id)["best_params"]["lookback"] in {2, 5, 10}
+
+
+def test_sweep_heatmap_takes_best_over_other_params_unless_fixed() -> None:
+    results = {(2, 0.5): 1.5, (2, 1.0): 0.5, (5, 0.5): -1.0, (5, 1.0): 2.0}
+    for (lookback, allocation), sharpe in results.items():
+        params = {"lookback": lookback, "weight": 0.1, "allocation": allocation}
+        db.insert_sweep_result("s1", "momentum", params, {"sharpe": sharpe})
+    assert sweep_heatmap("s1", "lookback", "weight")["values"] == [[1.5, 2.0]]
+    fixed = sweep_heatmap("s1", "lookback", "weight", fixed={"allocation": 0.5})
+    assert fixed["values"] == [[1.5, -1.0]]